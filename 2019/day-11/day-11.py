@@ -8,13 +8,17 @@ Puzzle Solution in Python
 
 import argparse
 import logging
-import os
 import sys
 
-from enum import Enum, IntEnum, auto
-from types import SimpleNamespace as sn
+from enum import IntEnum
+from functools import partial
 from typing import Iterator
 
+from common.intcode import Computer
+from common.intcode_image import load_programs
+from common.intcode_profile import Profile, ProfiledComputer
+from common.intcode_trace import TracedComputer
+
 log = logging.getLogger(__name__)
 
 
@@ -35,339 +39,135 @@ class Directions(IntEnum):
     WEST = 3
 
 
-class Error(Exception):
-    """Base class for exceptions in this module."""
-    pass
-
-
-class HaltOpcode(Error):
-    """Exception when an HALT opcode is encountered.
-
-    Attributes:
-        opcode -- opcode value
-    """
-
-    def __init__(self):
-        super().__init__()
-
-
 # Common Methods ---------------------------------------------------------------
 
 
-def load_contents(filename: str) -> Iterator[map]:
+def load_contents(filename: str) -> Iterator[list[int]]:
     """Load and convert contents from file
 
     :param filename: input filename
     :return: iterator yielding a list of integers
     """
-    lines = open(filename).read().strip().split(os.linesep)
-    for line in lines:
-        yield {i: int(token) for i, token in enumerate(line.split(','))}
-
-
-# Intcode Methods --------------------------------------------------------------
-
-
-INTCODE_INSTR_MOD = 100
-DEFAULT_RAM_VALUE = 0
-ISA = {
-    1: sn(name='Add', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    2: sn(name='Mul', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    3: sn(name='In', input_args=1, load_args=0, store_args=1, output_args=0, jump=False),
-    4: sn(name='Out', input_args=0, load_args=1, store_args=0, output_args=1, jump=False),
-    5: sn(name='JNZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
-    6: sn(name='JZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
-    7: sn(name='LT', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    8: sn(name='Eq', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    9: sn(name='RBS', input_args=0, load_args=1, store_args=0, output_args=0, jump=False),
-    99: sn(name='Halt', input_args=0, load_args=0, store_args=0, output_args=0, jump=False),
-}
+    yield from load_programs(filename=filename)
 
 
-class Error(Exception):
-    """Base class for exceptions in this module."""
-    pass
+# Solver Methods ---------------------------------------------------------------
 
 
-class Mode(IntEnum):
-    POSITION = 0
-    IMMEDIATE = 1
-    RELATIVE = 2
+HULL_SIZE = 64
+STEPS = {
+    Directions.NORTH: (0, 1),
+    Directions.EAST: (1, 0),
+    Directions.SOUTH: (0, -1),
+    Directions.WEST: (-1, 0),
+}
 
 
-class OpcodeError(Error):
-    """Exception raised for unsupported opcode.
+class Hull:
+    """Dense grid of hull panels, growing to cover any visited position
 
     Attributes:
-        opcode -- opcode value
+        x0 -- horizontal coordinate of the first column
+        y0 -- vertical coordinate of the first row
+        width -- number of columns
+        height -- number of rows
+        colors -- color per panel, row after row
+        painted -- painted white at least once flag per panel
+        count -- number of panels painted white at least once
     """
 
-    def __init__(self, opcode: int):
-        message = f'Invalid opcode {opcode}'
-        super().__init__(message)
-
-
-def decode(instruction: int) -> [int, list[int]]:
-    """Decode instruction into opcode and load modes
-
-    :param instruction: instruction
-    :return: opcode and access mode per loaded arguments
-    """
-    opcode = instruction % INTCODE_INSTR_MOD
-    if opcode not in ISA:
-        raise OpcodeError(opcode=opcode)
-    args_qty = ISA[opcode].load_args + ISA[opcode].store_args
-    modes_int = instruction // INTCODE_INSTR_MOD
-    modes = [Mode(int(m)) for m in reversed(str(modes_int))]
-    leading_zero_modes = [Mode.POSITION] * (args_qty - len(modes))
-    padded_modes = modes + leading_zero_modes
-    log.debug(f'{instruction=}: {ISA[opcode].name}, {padded_modes}')
-    return opcode, padded_modes
-
-
-def fetch(instruction_pointer: int, load_modes: list[int], ram: dict[int, int],
-          relative_base: int, opcode:int, input_stack: list[int]) -> list[int]:
-    """Fetch operands from memory
-
-    :param instruction_pointer: instruction operation code
-    :param load_modes: access mode per loaded arguments
-    :param ram: memory contents mapping
-    :param relative_base: relative base address value
-    :param opcode: instruction opcode
-    :param input_stack: initial input value list
-    :return: operand values
-    """
-    operands = list()
-    if ISA[opcode].input_args > 0:
-        for _ in range(ISA[opcode].input_args):
-            value = input_stack.pop()
-            operands.append(value)
-    else:
-        for i, mode in enumerate(load_modes):
-            pointer = instruction_pointer + 1 + i
-            contents = ram[pointer]
-            if mode == Mode.IMMEDIATE:
-                operands.append(contents)
-            elif mode == Mode.POSITION:
-                operands.append(ram.get(contents, DEFAULT_RAM_VALUE))
-            elif mode == Mode.RELATIVE:
-                operands.append(ram[relative_base + contents])
-            else:
-                raise Exception
-    log.debug(f'{operands=}')
-    return operands
-
-
-def execute(opcode:int , operands: list[int]) -> int:
-    """Execute an instruction
-
-    :param opcode: instruction opcode
-    :param operands: operand values
-    :return:
-    """
-    result = None
-    if ISA[opcode].name == 'Add':
-        result = sum(operands)
-    if ISA[opcode].name == 'Mul':
-        result = operands[0] * operands[1]
-    if ISA[opcode].name == 'In':
-        result = operands[0]
-    if ISA[opcode].name == 'Out':
-        result = operands[0]
-    if ISA[opcode].name == 'LT':
-        result = 1 if operands[0] < operands[1] else 0
-    if ISA[opcode].name == 'Eq':
-        result = 1 if operands[0] == operands[1] else 0
-    if ISA[opcode].name == 'JNZ':
-        result = operands[1]
-    if ISA[opcode].name == 'JZ':
-        result = operands[1]
-    if ISA[opcode].name == 'RBS':
-        result = operands[0]
-    assert result is not None
-    log.debug(f'executed {opcode=}, {operands=}, {result=}')
-    return result
-
-
-def store(
-        opcode: int,
-        store_mode: int,
-        output: int,
-        instruction_pointer: int,
-        ram: dict[int, int],
-        relative_base: int) -> None:
-    """Store output value back into memory
-
-    :param opcode: instruction opcode
-    :param store_mode: stored operand mode
-    :param output: output after execution of the instruction
-    :param instruction_pointer: pointer to the current instruction
-    :param ram: memory contents mapping
-    :param relative_base: relative base address value
-    :return: nothing
-    """
-    no_store = ISA[opcode].store_args == 0
-    if no_store:
-        return
-    if store_mode == Mode.RELATIVE:
-        store_pointer_address = instruction_pointer + 1 + ISA[opcode].load_args
-        store_pointer = relative_base + ram.get(store_pointer_address, DEFAULT_RAM_VALUE)
-    elif store_mode == Mode.POSITION:
-        store_pointer_address = instruction_pointer + 1 + ISA[opcode].load_args
-        store_pointer = ram[store_pointer_address]
-    else:
-        raise Exception
-    ram[store_pointer] = output
-    log.debug(f'stored {output} @{store_pointer}')
-    return
-
-
-def push_output(opcode: int, output: int) -> list[int]:
-    """Push value in the output stack
-
-    :param opcode: instruction opcode
-    :param output: output after execution of the instruction
-    :return: new value to push to the output stack
-    """
-    output_ = list()
-    if ISA[opcode].name == 'Out':
-        output_.append(output)
-    return output_
-
-
-def shift_base(opcode: int, output: int) -> int:
-    """Compute relative base shift
-
-    :param opcode: instruction opcode
-    :param output: output after execution of the instruction
-    :return: relative base shift value
-    """
-    shift = 0
-    if ISA[opcode].name == 'RBS':
-        shift = output
-    return shift
-
-
-def jump_next_instruction(opcode: int, instruction_pointer: int,
-                          operands: list[int]) -> int:
-    """Compute pointer to following instruction
-
-    :param opcode: instruction opcode
-    :param instruction_pointer: pointer to the current instruction
-    :param operands: operand values
-    :return: pointer to following instruction
-    """
-    next_instruction = instruction_pointer + 1 + \
-                       ISA[opcode].load_args + ISA[opcode].store_args
-    if ISA[opcode].name in ['Add', 'Mul', 'RBS', 'LT', 'Eq', 'In', 'Out']:
-        pass
-    elif ISA[opcode].name == 'JNZ':
-        non_zero = operands[0] != 0
-        next_instruction = operands[1] if non_zero else next_instruction
-    elif ISA[opcode].name == 'JZ':
-        non_zero = operands[0] == 0
-        next_instruction = operands[1] if non_zero else next_instruction
-    else:
-        raise Exception
-    log.debug(f'{opcode=}, {next_instruction=}')
-    return next_instruction
-
-
-# Solver Methods ---------------------------------------------------------------
-
-
-def paint_panel(panels: map, color: int, robot: map, turn: int) -> None:
-    """Paint panel and move the robot
-
-    :param panels: map of panels
-    :param color: direction to turn to after advancing
-    :param robot: robot state
-    :param turn: direction to turn to after advancing
-    :return: nothing
-    """
-    panels[robot['position']] = color
-    painted = color == Colors.WHITE
-    if painted:
-        robot['trail'].append(robot['position'])
-    if turn == Turns.LEFT:
-        robot['heading'] = Directions((robot['heading'] - 1) % 4)
-    if turn == Turns.RIGHT:
-        robot['heading'] = Directions((robot['heading'] + 1) % 4)
-    heading = robot['heading']
-    if heading == Directions.NORTH:
-        robot['position'] = (robot['position'][0], robot['position'][1] + 1)
-    if heading == Directions.EAST:
-        robot['position'] = (robot['position'][0] + 1, robot['position'][1])
-    if heading == Directions.SOUTH:
-        robot['position'] = (robot['position'][0], robot['position'][1] - 1)
-    if heading == Directions.WEST:
-        robot['position'] = (robot['position'][0] - 1, robot['position'][1])
-
-
-def step(ram: dict, regs: dict, inputs: list[int]) -> tuple:
-    """Advance robot by a single step
-
-    :param ram: memory contents
-    :param regs: register map
-    :param inputs: input queue
-    :return: updated pc; new color and turn direction
-    """
-    pc = regs['pc']
-    relative_base = regs['rb']
-    output_values = list()
-    while True:
-        instruction = ram[pc]
-        opcode, operand_modes = decode(instruction=instruction)
-        halt = ISA[opcode].name == 'Halt'
-        if halt:
-            raise HaltOpcode
-        load_modes = operand_modes[:ISA[opcode].load_args]
-        operands = fetch(instruction_pointer=pc,
-                         load_modes=load_modes, ram=ram,
-                         relative_base=relative_base,
-                         opcode=opcode, input_stack=inputs)
-        output = execute(opcode=opcode, operands=operands)
-        store_mode = operand_modes[-ISA[opcode].store_args:][0]
-        store(opcode=opcode, store_mode=store_mode, output=output,
-              instruction_pointer=pc, ram=ram,
-              relative_base=relative_base)
-        output_values.extend(push_output(opcode=opcode, output=output))
-        relative_base += shift_base(opcode=opcode, output=output)
-        next_instruction_pointer = jump_next_instruction(
-            opcode=opcode, instruction_pointer=pc, operands=operands)
-        pc = next_instruction_pointer
-        if len(output_values) == 2:
-            break
-    regs['pc'] = pc
-    regs['rb'] = relative_base
-    return tuple(output_values)
-
-
-def solve(contents: map, start_panel_color: int = Colors.BLACK) -> tuple:
+    def __init__(self, size: int = HULL_SIZE):
+        self.x0 = self.y0 = -(size // 2)
+        self.width = self.height = size
+        self.colors = bytearray(size * size)
+        self.painted = bytearray(size * size)
+        self.count = 0
+
+    def index(self, x: int, y: int) -> int:
+        """Get the index of a panel, growing the grid if needed
+
+        :param x: horizontal coordinate
+        :param y: vertical coordinate
+        :return: index in the color and painted planes
+        """
+        column = x - self.x0
+        row = y - self.y0
+        if not (0 <= column < self.width and 0 <= row < self.height):
+            self.grow(x=x, y=y)
+            column = x - self.x0
+            row = y - self.y0
+        return row * self.width + column
+
+    def grow(self, x: int, y: int) -> None:
+        """Double grid dimensions until they cover a position
+
+        :param x: horizontal coordinate
+        :param y: vertical coordinate
+        :return: nothing
+        """
+        x0, y0, width, height = self.x0, self.y0, self.width, self.height
+        while not x0 <= x < x0 + width:
+            x0 -= width // 2
+            width *= 2
+        while not y0 <= y < y0 + height:
+            y0 -= height // 2
+            height *= 2
+        colors = bytearray(width * height)
+        painted = bytearray(width * height)
+        for row in range(self.height):
+            start = row * self.width
+            index = (row + self.y0 - y0) * width + self.x0 - x0
+            colors[index:index + self.width] = \
+                self.colors[start:start + self.width]
+            painted[index:index + self.width] = \
+                self.painted[start:start + self.width]
+        log.debug(f'Hull grown to {width}x{height}')
+        self.x0, self.y0, self.width, self.height = x0, y0, width, height
+        self.colors = colors
+        self.painted = painted
+
+    def panels(self) -> dict[tuple[int, int], int]:
+        """Get white panels
+
+        :return: color per panel coordinates
+        """
+        return {(self.x0 + i % self.width, self.y0 + i // self.width): color
+                for i, color in enumerate(self.colors)
+                if color == Colors.WHITE}
+
+
+def solve(contents: list[int], start_panel_color: int = Colors.BLACK,
+          computer_type: type = Computer) -> tuple:
     """Solve puzzle part one
 
     :param contents: puzzle input contents
     :param start_panel_color: color of the start panel
+    :param computer_type: Intcode computer backend
     :return: puzzle answer
     """
-    robot = {
-        'position': (0, 0),
-        'heading': Directions.NORTH,
-        'trail': [],
-    }
-    panels = {(0, 0): start_panel_color}
-    regs = {'pc': 0, 'rb': 0}
-    try:
-        while True:
-            color = panels.get(robot['position'], Colors.BLACK)
-            outputs = step(ram=contents, regs=regs, inputs=[color])
-            new_color = Colors(outputs[0])
-            turn = Turns(outputs[1])
-            paint_panel(panels=panels, color=new_color, robot=robot, turn=turn)
-    except HaltOpcode:
-        log.debug(f'Got halt, {robot=}')
-    panel_len = len(set(robot['trail']))
-    return panel_len, panels
+    hull = Hull()
+    index = hull.index(x=0, y=0)
+    hull.colors[index] = start_panel_color
+    x = y = 0
+    heading = Directions.NORTH
+    computer = computer_type(program=contents)
+
+    def camera() -> int:
+        panel = hull.index(x=x, y=y)
+        return hull.colors[panel]
+
+    for color, turn in computer.records(arity=2, on_input=camera):
+        index = hull.index(x=x, y=y)
+        hull.colors[index] = color
+        if color == Colors.WHITE and not hull.painted[index]:
+            hull.painted[index] = 1
+            hull.count += 1
+        heading = (heading + (1 if turn == Turns.RIGHT else -1)) % 4
+        dx, dy = STEPS[heading]
+        x += dx
+        y += dy
+    log.debug(f'Got halt, robot at {(x, y)}')
+    return hull.count, hull.panels()
 
 
 def print_panels(panels: dict) -> None:
@@ -418,6 +218,10 @@ def parse_arguments() -> argparse.Namespace:
     pa('filename', type=str, help='input contents filename')
     pa('-p', '--part', type=int, help='solve only the given part')
     pa('-v', '--verbose', action='store_true', help='print extra messages')
+    pa('--profile', action='store_true',
+       help='report Intcode execution statistics')
+    pa('--trace', type=int, metavar='DEPTH',
+       help='log the last executed Intcode instructions on halt or error')
     arguments = parser.parse_args()
     return arguments
 
@@ -432,15 +236,24 @@ def main() -> int:
     log.debug(f'Arguments: {args}')
     compute_part_one = not args.part or 1 == args.part
     compute_part_two = not args.part or 2 == args.part
+    profile = Profile()
+    computer_type = Computer
+    if args.profile:
+        computer_type = partial(ProfiledComputer, profile=profile)
+    elif args.trace:
+        computer_type = partial(TracedComputer, depth=args.trace)
     if compute_part_one:
         contents = next(load_contents(filename=args.filename))
-        answer, _ = solve(contents=contents)
+        answer, _ = solve(contents=contents, computer_type=computer_type)
         print(f'part one: {answer=}')
     if compute_part_two:
         contents = next(load_contents(filename=args.filename))
-        _, panels = solve(contents=contents, start_panel_color=Colors.WHITE)
+        _, panels = solve(contents=contents, start_panel_color=Colors.WHITE,
+                          computer_type=computer_type)
         panels = {k: v for k, v in panels.items() if v == Colors.WHITE}
         print_panels(panels=panels)
+    if args.profile:
+        print(profile.report())
     return EXIT_SUCCESS
 # JELEFGHP
 
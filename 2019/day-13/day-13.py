@@ -8,16 +8,24 @@ Puzzle Solution in Python
 
 import argparse
 import logging
-import os
 import sys
 
 from collections import Counter
 from enum import IntEnum
-from types import SimpleNamespace as sn
-from typing import Iterator
+from functools import partial
+from pathlib import Path
+from typing import Iterator, Optional
+
+from common.intcode import Computer
+from common.intcode_checkpoint import load_checkpoint, save_checkpoint
+from common.intcode_image import load_programs
+from common.intcode_profile import Profile, ProfiledComputer
+from common.intcode_trace import TracedComputer
 
 log = logging.getLogger(__name__)
 
+CHECKPOINT_MOVES = 500
+
 
 class TilesTypes(IntEnum):
     EMPTY = 0
@@ -36,281 +44,18 @@ class Joystick(IntEnum):
 # Common Methods ---------------------------------------------------------------
 
 
-def load_contents(filename: str) -> Iterator[map]:
+def load_contents(filename: str) -> Iterator[list[int]]:
     """Load and convert contents from file
 
     :param filename: input filename
     :return: iterator yielding a list of integers
     """
-    lines = open(filename).read().strip().split(os.linesep)
-    for line in lines:
-        yield {i: int(token) for i, token in enumerate(line.split(','))}
-
-
-# Intcode Methods --------------------------------------------------------------
-
-
-INTCODE_INSTR_MOD = 100
-DEFAULT_RAM_VALUE = 0
-ISA = {
-    1: sn(name='Add', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    2: sn(name='Mul', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    3: sn(name='In', input_args=1, load_args=0, store_args=1, output_args=0, jump=False),
-    4: sn(name='Out', input_args=0, load_args=1, store_args=0, output_args=1, jump=False),
-    5: sn(name='JNZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
-    6: sn(name='JZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
-    7: sn(name='LT', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    8: sn(name='Eq', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    9: sn(name='RBS', input_args=0, load_args=1, store_args=0, output_args=0, jump=False),
-    99: sn(name='Halt', input_args=0, load_args=0, store_args=0, output_args=0, jump=False),
-}
-
-
-class Error(Exception):
-    """Base class for exceptions in this module."""
-    pass
-
-
-class Mode(IntEnum):
-    POSITION = 0
-    IMMEDIATE = 1
-    RELATIVE = 2
-
-
-class OpcodeError(Error):
-    """Exception raised for unsupported opcode.
-
-    Attributes:
-        opcode -- opcode value
-    """
-
-    def __init__(self, opcode: int):
-        message = f'Invalid opcode {opcode}'
-        super().__init__(message)
-
-
-class HaltOpcode(Error):
-    """Exception when an HALT opcode is encountered.
-
-    Attributes:
-        opcode -- opcode value
-    """
-
-    def __init__(self, message=""):
-        super().__init__(message)
-
-
-def decode(instruction: int) -> [int, list[int]]:
-    """Decode instruction into opcode and load modes
-
-    :param instruction: instruction
-    :return: opcode and access mode per loaded arguments
-    """
-    opcode = instruction % INTCODE_INSTR_MOD
-    if opcode not in ISA:
-        raise OpcodeError(opcode=opcode)
-    args_qty = ISA[opcode].load_args + ISA[opcode].store_args
-    modes_int = instruction // INTCODE_INSTR_MOD
-    modes = [Mode(int(m)) for m in reversed(str(modes_int))]
-    leading_zero_modes = [Mode.POSITION] * (args_qty - len(modes))
-    padded_modes = modes + leading_zero_modes
-    log.debug(f'{instruction=}: {ISA[opcode].name}, {padded_modes}')
-    return opcode, padded_modes
-
-
-def fetch(instruction_pointer: int, load_modes: list[int], ram: dict[int, int],
-          relative_base: int, opcode: int, input_stack: list[int]) -> list[int]:
-    """Fetch operands from memory
-
-    :param instruction_pointer: instruction operation code
-    :param load_modes: access mode per loaded arguments
-    :param ram: memory contents mapping
-    :param relative_base: relative base address value
-    :param opcode: instruction opcode
-    :param input_stack: initial input value list
-    :return: operand values
-    """
-    operands = list()
-    if ISA[opcode].input_args > 0:
-        for _ in range(ISA[opcode].input_args):
-            value = input_stack.pop()
-            operands.append(value)
-    else:
-        for i, mode in enumerate(load_modes):
-            pointer = instruction_pointer + 1 + i
-            contents = ram[pointer]
-            if mode == Mode.IMMEDIATE:
-                log.debug(f'argument {i}: mode {str(mode)}, value {contents}')
-                operands.append(contents)
-            elif mode == Mode.POSITION:
-                log.debug(f'argument {i}: mode {str(mode)}, position {contents}, value {ram[contents]}')
-                #operands.append(ram.get(contents, DEFAULT_RAM_VALUE))
-                operands.append(ram[contents])
-            elif mode == Mode.RELATIVE:
-                log.debug(f'argument {i}: mode {str(mode)}, position {relative_base + contents}, value {ram[relative_base + contents]}')
-                operands.append(ram[relative_base + contents])
-            else:
-                raise Exception
-    log.debug(f'{operands=}')
-    return operands
-
-
-def execute(opcode: int, operands: list[int]) -> int:
-    """Execute an instruction
-
-    :param opcode: instruction opcode
-    :param operands: operand values
-    :return:
-    """
-    result = None
-    if ISA[opcode].name == 'Add':
-        result = sum(operands)
-    if ISA[opcode].name == 'Mul':
-        result = operands[0] * operands[1]
-    if ISA[opcode].name == 'In':
-        result = operands[0]
-    if ISA[opcode].name == 'Out':
-        result = operands[0]
-    if ISA[opcode].name == 'LT':
-        result = 1 if operands[0] < operands[1] else 0
-    if ISA[opcode].name == 'Eq':
-        result = 1 if operands[0] == operands[1] else 0
-    if ISA[opcode].name == 'JNZ':
-        result = operands[1]
-    if ISA[opcode].name == 'JZ':
-        result = operands[1]
-    if ISA[opcode].name == 'RBS':
-        result = operands[0]
-    assert result is not None
-    log.debug(f'executed {opcode=}, {operands=}, {result=}')
-    return result
-
-
-def store(
-        opcode: int,
-        store_mode: int,
-        output: int,
-        instruction_pointer: int,
-        ram: dict[int, int],
-        relative_base: int) -> None:
-    """Store output value back into memory
-
-    :param opcode: instruction opcode
-    :param store_mode: stored operand mode
-    :param output: output after execution of the instruction
-    :param instruction_pointer: pointer to the current instruction
-    :param ram: memory contents mapping
-    :param relative_base: relative base address value
-    :return: nothing
-    """
-    no_store = ISA[opcode].store_args == 0
-    if no_store:
-        return
-    if store_mode == Mode.RELATIVE:
-        store_pointer_address = instruction_pointer + 1 + ISA[opcode].load_args
-        #store_pointer = relative_base + ram.get(store_pointer_address, DEFAULT_RAM_VALUE)
-        store_pointer = relative_base + ram[store_pointer_address]
-    elif store_mode == Mode.POSITION:
-        store_pointer_address = instruction_pointer + 1 + ISA[opcode].load_args
-        store_pointer = ram[store_pointer_address]
-    else:
-        raise Exception
-    ram[store_pointer] = output
-    log.debug(f'stored {output} @{store_pointer}')
-    return
-
-
-def push_output(opcode: int, output: int) -> list[int]:
-    """Push value in the output stack
-
-    :param opcode: instruction opcode
-    :param output: output after execution of the instruction
-    :return: new value to push to the output stack
-    """
-    output_ = list()
-    if ISA[opcode].name == 'Out':
-        output_.append(output)
-    return output_
-
-
-def shift_base(opcode: int, output: int) -> int:
-    """Compute relative base shift
-
-    :param opcode: instruction opcode
-    :param output: output after execution of the instruction
-    :return: relative base shift value
-    """
-    shift = 0
-    if ISA[opcode].name == 'RBS':
-        shift = output
-    return shift
-
-
-def jump_next_instruction(opcode: int, instruction_pointer: int,
-                          operands: list[int]) -> int:
-    """Compute pointer to following instruction
-
-    :param opcode: instruction opcode
-    :param instruction_pointer: pointer to the current instruction
-    :param operands: operand values
-    :return: pointer to following instruction
-    """
-    next_instruction = instruction_pointer + 1 + \
-        ISA[opcode].load_args + ISA[opcode].store_args
-    if ISA[opcode].name in ['Add', 'Mul', 'RBS', 'LT', 'Eq', 'In', 'Out']:
-        pass
-    elif ISA[opcode].name == 'JNZ':
-        non_zero = operands[0] != 0
-        next_instruction = operands[1] if non_zero else next_instruction
-    elif ISA[opcode].name == 'JZ':
-        non_zero = operands[0] == 0
-        next_instruction = operands[1] if non_zero else next_instruction
-    else:
-        raise Exception
-    log.debug(f'{opcode=}, {next_instruction=}')
-    return next_instruction
+    yield from load_programs(filename=filename)
 
 
 # Solver Methods ---------------------------------------------------------------
 
 
-def step(ram: dict, regs: dict, inputs: list[int]) -> tuple:
-    """Advance robot by a single step
-
-    :param ram: memory contents
-    :param regs: register map
-    :param inputs: input queue
-    :return: updated pc; new color and turn direction
-    """
-    pc = regs['pc']
-    relative_base = regs['rb']
-    output_values = list()
-    while True:
-        instruction = ram[pc]
-        opcode, operand_modes = decode(instruction=instruction)
-        halt = ISA[opcode].name == 'Halt'
-        if halt:
-            break
-        load_modes = operand_modes[:ISA[opcode].load_args]
-        operands = fetch(instruction_pointer=pc,
-                         load_modes=load_modes, ram=ram,
-                         relative_base=relative_base,
-                         opcode=opcode, input_stack=inputs)
-        output = execute(opcode=opcode, operands=operands)
-        store_mode = operand_modes[-ISA[opcode].store_args:][0]
-        store(opcode=opcode, store_mode=store_mode, output=output,
-              instruction_pointer=pc, ram=ram,
-              relative_base=relative_base)
-        output_values.extend(push_output(opcode=opcode, output=output))
-        relative_base += shift_base(opcode=opcode, output=output)
-        next_instruction_pointer = jump_next_instruction(
-            opcode=opcode, instruction_pointer=pc, operands=operands)
-        pc = next_instruction_pointer
-    regs['pc'] = pc
-    regs['rb'] = relative_base
-    return tuple(output_values)
-
-
 def map_tiles(tiles: [int, int, int]) -> dict:
     """Map a list in of tiles
 
@@ -321,17 +66,14 @@ def map_tiles(tiles: [int, int, int]) -> dict:
     return d
 
 
-def solve(contents: map) -> int:
+def solve(contents: list[int], computer_type: type = Computer) -> int:
     """Solve puzzle part one
 
     :param contents: puzzle input contents
+    :param computer_type: Intcode computer backend
     :return: puzzle answer
     """
-    regs = {'pc': 0, 'rb': 0}
-    output_values = step(ram=contents, regs=regs, inputs=[])
-    assert len(output_values) % 3 == 0
-    tiles_count: int = len(output_values) // 3
-    tiles = [output_values[3 * i:3 * i + 3] for i in range(tiles_count)]
+    tiles = list(computer_type(program=contents).records(arity=3))
     map_ = map_tiles(tiles=tiles)
     pic = []
     for y in range(min(map_.keys())[1], max(map_.keys())[1]+1):
@@ -375,96 +117,113 @@ def print_map(map_):
         print(''.join(line))
 
 
-def step_part_two(
-        ram: dict, regs: dict, inputs: list[int],
-        tiles: list[list[int]]) -> int:
-    """Advance robot by a single step
+class Screen:
+    """Arcade screen updated in place with each drawn tile
 
-    :param ram: memory contents
-    :param regs: register map
-    :param inputs: input queue
-    :param tiles: list of tiles
-    :return: ball position on the horizontal axis
+    Attributes:
+        tiles -- tile type per coordinates
+        blocks -- number of block tiles on screen
+        ball -- horizontal position of the ball, if drawn
+        paddle -- horizontal position of the paddle, if drawn
+        score -- current score
     """
-    pc = regs['pc']
-    relative_base = regs['rb']
-    tile = []
-    while True:
-        instruction = ram[pc]
-        opcode, operand_modes = decode(instruction=instruction)
-        halt = ISA[opcode].name == 'Halt'
-        if halt:
-            break
-        load_modes = operand_modes[:ISA[opcode].load_args]
-        operands = fetch(instruction_pointer=pc,
-                         load_modes=load_modes, ram=ram,
-                         relative_base=relative_base,
-                         opcode=opcode, input_stack=inputs)
-        output = execute(opcode=opcode, operands=operands)
-        store_mode = operand_modes[-ISA[opcode].store_args:][0]
-        store(opcode=opcode, store_mode=store_mode, output=output,
-              instruction_pointer=pc, ram=ram,
-              relative_base=relative_base)
-        tile.extend(push_output(opcode=opcode, output=output))
-        relative_base += shift_base(opcode=opcode, output=output)
-        next_instruction_pointer = jump_next_instruction(
-            opcode=opcode, instruction_pointer=pc, operands=operands)
-        pc = next_instruction_pointer
-        if len(tile) == 3:
-            tiles.append([*tile[0:2], tile[2]])
-            if tile[0] != -1 and tile[2] == TilesTypes.BALL:
-                break
-            tile = []
-    regs['pc'] = pc
-    regs['rb'] = relative_base
-
-
-def print_score(tiles: map):
-    assert (-1, 0) in tiles
-    print(f'Score: {tiles[(-1, 0)]}')
-
-
-def get_position(tiles: list, tile_type: TilesTypes) -> any:
-    """Get object position
-
-    :param tiles: map of tiles per coordinates
-    :param tile_type: target tile type
-    :return: position
+
+    def __init__(self):
+        self.tiles: dict[tuple[int, int], int] = {}
+        self.blocks = 0
+        self.ball: Optional[int] = None
+        self.paddle: Optional[int] = None
+        self.score = 0
+
+    def draw(self, x: int, y: int, tile: int) -> None:
+        """Apply a drawing instruction
+
+        :param x: horizontal position, or -1 for the score
+        :param y: vertical position
+        :param tile: tile type, or score value
+        :return: nothing
+        """
+        if x == -1 and y == 0:
+            self.score = tile
+            return
+        if self.tiles.get((x, y)) == TilesTypes.BLOCK:
+            self.blocks -= 1
+        self.tiles[(x, y)] = tile
+        if tile == TilesTypes.BLOCK:
+            self.blocks += 1
+        elif tile == TilesTypes.BALL:
+            self.ball = x
+        elif tile == TilesTypes.HORIZONTAL_PADDLE:
+            self.paddle = x
+
+    def records(self) -> list[int]:
+        """Get drawing instructions redrawing the screen from scratch
+
+        :return: flat list of horizontal position, vertical position and tile
+        """
+        values = [-1, 0, self.score]
+        for (x, y), tile in self.tiles.items():
+            values.extend((x, y, tile))
+        return values
+
+
+def step_part_two(computer: Computer, screen: Screen) -> None:
+    """Advance game until the ball moves
+
+    :param computer: Intcode computer running the game
+    :param screen: arcade screen
+    :return: nothing
     """
-    filtered_tiles = [t[0:2] for t in tiles if t[2] == tile_type]
-    if not len(filtered_tiles):
-        return None
-    return filtered_tiles[-1][0]
+    for x, y, tile in computer.records(arity=3):
+        screen.draw(x=x, y=y, tile=tile)
+        if x != -1 and tile == TilesTypes.BALL:
+            break
 
 
-def solve_part_two(contents: map) -> int:
+def solve_part_two(contents: list[int], computer_type: type = Computer,
+                   checkpoint: Optional[str] = None) -> int:
     """Solve puzzle part one
 
+    When a checkpoint filename is given, the game resumes from it if it
+    exists, and is saved into it every `CHECKPOINT_MOVES` joystick moves with
+    the screen contents as pending outputs.
+
     :param contents: puzzle input contents
+    :param computer_type: Intcode computer backend
+    :param checkpoint: checkpoint filename
     :return: puzzle answer
     """
     contents[0] = 2
 
-    regs = {'pc': 0, 'rb': 0}
-    inputs = []
-    tiles = []
+    screen = Screen()
+    if checkpoint and Path(checkpoint).exists():
+        computer, outputs = load_checkpoint(
+            path=checkpoint, computer_type=computer_type)
+        records = iter(outputs)
+        for x, y, tile in zip(records, records, records):
+            screen.draw(x=x, y=y, tile=tile)
+    else:
+        computer = computer_type(program=contents)
+    inputs = computer.inputs
     last_ball_position = None
+    moves = 0
     while True:
-        step_part_two(ram=contents, regs=regs, inputs=inputs, tiles=tiles)
-        map_ = map_tiles(tiles=tiles)
-        tile_ids = list(map_.values())
-        block_tiles = Counter(tile_ids)[TilesTypes.BLOCK]
-        if block_tiles == 0:
-            print_map(map_)
+        step_part_two(computer=computer, screen=screen)
+        if screen.blocks == 0:
+            print_map(screen.tiles)
             print('done')
-            return map_[(-1, 0)]
-        paddle_position = get_position(
-            tiles=tiles, tile_type=TilesTypes.HORIZONTAL_PADDLE)
+            return screen.score
+        if computer.halted:
+            raise Exception(f'ball lost with {screen.blocks} blocks left')
+        moves += 1
+        if checkpoint and moves % CHECKPOINT_MOVES == 0:
+            save_checkpoint(path=checkpoint, computer=computer,
+                            outputs=screen.records())
+        paddle_position = screen.paddle
         if paddle_position is None:
             inputs.append(Joystick.NEUTRAL)
             continue
-        ball_position = get_position(
-            tiles=tiles, tile_type=TilesTypes.BALL)
+        ball_position = screen.ball
         if last_ball_position is None:
             last_ball_position = ball_position
         next_ball_position = ball_position + (ball_position - last_ball_position)
@@ -477,6 +236,81 @@ def solve_part_two(contents: map) -> int:
         last_ball_position = ball_position
 
 
+def locate_state(contents: list[int]) -> tuple[int, int, int]:
+    """Locate the ball and paddle positions and the joystick input
+
+    A game is played with the paddle following the ball, keeping the program
+    addresses whose value matches the drawn positions at each input request.
+
+    :param contents: puzzle input contents, with coins inserted
+    :return: ball and paddle horizontal position addresses, and address of
+        the instruction reading the joystick
+    """
+    computer = Computer(program=contents)
+    cells = computer.memory.cells
+    screen = Screen()
+    ball = set(range(len(contents)))
+    paddle = set(range(len(contents)))
+    readers = set()
+
+    def joystick() -> int:
+        readers.add(computer.pc)
+        ball.difference_update({a for a in ball if cells[a] != screen.ball})
+        paddle.difference_update(
+            {a for a in paddle if cells[a] != screen.paddle})
+        return (screen.ball > screen.paddle) - (screen.ball < screen.paddle)
+
+    for x, y, tile in computer.records(arity=3, on_input=joystick):
+        screen.draw(x=x, y=y, tile=tile)
+        if len(ball) == 1 and len(paddle) == 1 and len(readers) == 1:
+            log.debug(f'ball @{min(ball)}, paddle @{min(paddle)}, '
+                      f'joystick @{min(readers)}')
+            return min(ball), min(paddle), min(readers)
+    raise Exception('ball and paddle positions not found')
+
+
+def solve_part_two_watch(contents: list[int]) -> int:
+    """Solve puzzle part two reading positions through watchpoints
+
+    The paddle follows the ball, both positions being read from the values
+    stored by the game. The joystick position is queued by a hook on the
+    instruction reading it, so that the game never waits for an input.
+    Output values are only read for the score.
+
+    :param contents: puzzle input contents
+    :return: puzzle answer
+    """
+    contents[0] = 2
+    ball_address, paddle_address, joystick_address = locate_state(
+        contents=contents)
+    computer = Computer(program=contents)
+    positions = {a: computer.load(address=a)
+                 for a in (ball_address, paddle_address)}
+
+    def record(_: Computer, address: int, value: int) -> None:
+        positions[address] = value
+
+    computer.watch(address=ball_address, callback=record)
+    computer.watch(address=paddle_address, callback=record)
+
+    def joystick(reader: Computer) -> None:
+        ball_position = positions[ball_address]
+        paddle_position = positions[paddle_address]
+        if ball_position < paddle_position:
+            reader.inputs.append(Joystick.LEFT)
+        elif ball_position > paddle_position:
+            reader.inputs.append(Joystick.RIGHT)
+        else:
+            reader.inputs.append(Joystick.NEUTRAL)
+
+    computer.hook(address=joystick_address, callback=joystick)
+    score = 0
+    for x, y, tile in computer.records(arity=3):
+        if x == -1 and y == 0:
+            score = tile
+    return score
+
+
 # Support Methods --------------------------------------------------------------
 
 
@@ -511,7 +345,22 @@ def parse_arguments() -> argparse.Namespace:
     pa('filename', type=str, help='input contents filename')
     pa('-p', '--part', type=int, help='solve only the given part')
     pa('-v', '--verbose', action='store_true', help='print extra messages')
+    pa('-k', '--checkpoint', type=str, metavar='FILE',
+       help='resume part two from and save it into a checkpoint file')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-w', '--watch', action='store_true',
+                      help='drive the joystick from watched memory addresses')
+    mode.add_argument('--profile', action='store_true',
+                      help='report Intcode execution statistics')
+    mode.add_argument('--trace', type=int, metavar='DEPTH',
+                      help='print the last executed Intcode instructions on '
+                           'halt or error')
     arguments = parser.parse_args()
+    if arguments.trace is not None and arguments.trace < 1:
+        parser.error('argument --trace: DEPTH must be at least 1')
+    if arguments.watch and arguments.checkpoint:
+        parser.error('argument -w/--watch: not allowed with argument '
+                     '-k/--checkpoint')
     return arguments
 
 
@@ -525,15 +374,28 @@ def main() -> int:
     log.debug(f'Arguments: {args}')
     compute_part_one = not args.part or 1 == args.part
     compute_part_two = not args.part or 2 == args.part
+    profile = Profile()
+    computer_type = Computer
+    if args.profile:
+        computer_type = partial(ProfiledComputer, profile=profile)
+    elif args.trace is not None:
+        computer_type = partial(TracedComputer, depth=args.trace)
     if compute_part_one:
         contents = next(load_contents(filename=args.filename))
-        answer = solve(contents=contents)
+        answer = solve(contents=contents, computer_type=computer_type)
         print(f'part one: {answer=}')
     if compute_part_two:
         contents = next(load_contents(filename=args.filename))
-        answer = solve_part_two(contents=contents)
+        if args.watch:
+            answer = solve_part_two_watch(contents=contents)
+        else:
+            answer = solve_part_two(
+                contents=contents, computer_type=computer_type,
+                checkpoint=args.checkpoint)
         print(f'part two: {answer=}')
-        return EXIT_SUCCESS
+    if args.profile:
+        print(profile.report())
+    return EXIT_SUCCESS
 
 
 if __name__ == "__main__":
@@ -8,7 +8,10 @@ Puzzle Solution in Python
 
 import argparse
 import logging
+import multiprocessing
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
 
 
 EXIT_SUCCESS = 0
@@ -108,26 +111,259 @@ def solve(contents: list[int]) -> int:
 
 
 REQUESTED_OUTPUT = 19690720
+GRID_SIZE = 100
 
 
-def solve_part_two(contents: list[int]) -> int:
+def grid_size(contents: list[int], size: Optional[int] = None) -> int:
+    """Number of noun and verb values to search
+
+    :param contents: list of integers
+    :param size: requested number of values, default for the program if none
+    :return: number of noun values, also the number of verb values
+    """
+    if size is not None:
+        return size
+    input_program = len(contents) > 12
+    return GRID_SIZE if input_program else len(contents)
+
+
+def solve_part_two(contents: list[int], target: int = REQUESTED_OUTPUT,
+                   size: Optional[int] = None) -> int:
     """Solve part two of the puzzle
 
     :param contents: list of integers
+    :param target: requested value of the first position
+    :param size: number of noun and verb values to search
     :return: answer for the part one of the puzzle
     """
-    input_program = len(contents) > 12
-    upper_bound = 100 if input_program else len(contents)
+    upper_bound = grid_size(contents=contents, size=size)
     for noun in range(upper_bound):
         for verb in range(upper_bound):
             first_position = execute_program(
                 contents=contents, noun=noun, verb=verb)
-            if REQUESTED_OUTPUT == first_position:
+            if target == first_position:
                 log.info(f'noun: {noun}, verb: {verb}')
                 answer = 100 * noun + verb
                 return answer
 
 
+Polynomial = dict[tuple[int, int], int]
+NOUN = {(1, 0): 1}
+VERB = {(0, 1): 1}
+
+
+def add_polynomials(a: Polynomial, b: Polynomial) -> Polynomial:
+    """Add two polynomials of the noun and the verb
+
+    :param a: polynomial mapping (noun degree, verb degree) to coefficients
+    :param b: polynomial mapping (noun degree, verb degree) to coefficients
+    :return: sum polynomial
+    """
+    result = dict(a)
+    for degrees, coefficient in b.items():
+        result[degrees] = result.get(degrees, 0) + coefficient
+    return {k: v for k, v in result.items() if v != 0}
+
+
+def multiply_polynomials(a: Polynomial, b: Polynomial) -> Polynomial:
+    """Multiply two polynomials of the noun and the verb
+
+    :param a: polynomial mapping (noun degree, verb degree) to coefficients
+    :param b: polynomial mapping (noun degree, verb degree) to coefficients
+    :return: product polynomial
+    """
+    result = {}
+    for (i, j), x in a.items():
+        for (k, l), y in b.items():
+            result[(i + k, j + l)] = result.get((i + k, j + l), 0) + x * y
+    return {k: v for k, v in result.items() if v != 0}
+
+
+def concrete(value: Optional[Polynomial]) -> Optional[int]:
+    """Get the value of a constant polynomial
+
+    :param value: polynomial or nothing if unknown
+    :return: constant value, nothing if the value depends on the noun or verb
+    """
+    if value is None or any(degrees != (0, 0) for degrees in value):
+        return None
+    return value.get((0, 0), 0)
+
+
+def execute_symbolic(contents: list[int]) -> Polynomial:
+    """Run the program once with symbolic noun and verb values
+
+    Values read through a pointer depending on the noun or verb are unknown.
+    They may be stored, but must be overwritten before reaching the first
+    position.
+
+    :param contents: list of integers
+    :return: first position as a polynomial of the noun and the verb
+    """
+    program = [{(0, 0): v} if v else {} for v in contents]
+    program[1] = NOUN
+    program[2] = VERB
+    pc = 0
+    while True:
+        instr = concrete(program[pc])
+        if instr == HALT:
+            break
+        if instr not in [ADD, MUL]:
+            raise ValueError(f'Unsupported instruction @{pc}: {instr}')
+        a_ptr, b_ptr, r_ptr = map(concrete, program[pc + 1:pc + 4])
+        if r_ptr is None:
+            raise ValueError(f'Symbolic store address @{pc}')
+        a = None if a_ptr is None else program[a_ptr]
+        b = None if b_ptr is None else program[b_ptr]
+        if a is None or b is None:
+            program[r_ptr] = None
+        elif instr == ADD:
+            program[r_ptr] = add_polynomials(a, b)
+        else:
+            program[r_ptr] = multiply_polynomials(a, b)
+        pc += 4
+    if program[0] is None:
+        raise ValueError('First position depends on a symbolic address')
+    return program[0]
+
+
+def solve_part_two_symbolic(contents: list[int],
+                            target: int = REQUESTED_OUTPUT,
+                            size: Optional[int] = None) -> int:
+    """Solve part two of the puzzle from the symbolic first position
+
+    For each noun, a first position linear in the verb is solved directly,
+    other polynomials are evaluated for each verb. Programs which cannot run
+    symbolically are solved by the sequential search.
+
+    :param contents: list of integers
+    :param target: requested value of the first position
+    :param size: number of noun and verb values to search
+    :return: answer for the part two of the puzzle
+    """
+    try:
+        polynomial = execute_symbolic(contents=contents)
+    except ValueError as error:
+        log.info(f'Symbolic execution failed: {error}')
+        return solve_part_two(contents=contents, target=target, size=size)
+    log.info(f'first position: {polynomial}')
+    upper_bound = grid_size(contents=contents, size=size)
+    verb_degree = max(j for _, j in polynomial) if polynomial else 0
+    for noun in range(upper_bound):
+        coefficients = [0] * (verb_degree + 1)
+        for (i, j), coefficient in polynomial.items():
+            coefficients[j] += coefficient * noun ** i
+        if verb_degree == 0 or coefficients[1:] == [0] * verb_degree:
+            verbs = [0] if coefficients[0] == target else []
+        elif verb_degree == 1:
+            verb, remainder = divmod(target - coefficients[0], coefficients[1])
+            verbs = [verb] if remainder == 0 else []
+        else:
+            verbs = [v for v in range(upper_bound) if target == sum(
+                c * v ** j for j, c in enumerate(coefficients))]
+        verbs = [v for v in verbs if 0 <= v < upper_bound]
+        if verbs:
+            log.info(f'noun: {noun}, verb: {verbs[0]}')
+            answer = 100 * noun + verbs[0]
+            return answer
+
+
+worker_state = {}
+
+
+def init_worker(contents: list[int], found: multiprocessing.Event) -> None:
+    """Keep the program and the shared stop flag in the worker process
+
+    :param contents: list of integers
+    :param found: event set once any worker finds the requested output
+    :return: nothing
+    """
+    worker_state['contents'] = contents
+    worker_state['found'] = found
+
+
+def search_noun(noun: int, upper_bound: int,
+                target: int) -> Optional[tuple[int, int]]:
+    """Search the verb giving the requested output for a given noun
+
+    :param noun: noun value
+    :param upper_bound: number of verb values
+    :param target: requested value of the first position
+    :return: noun and verb pair, nothing if not found or cancelled
+    """
+    contents = worker_state['contents']
+    found = worker_state['found']
+    for verb in range(upper_bound):
+        if found.is_set():
+            return None
+        if target == execute_program(contents=contents, noun=noun, verb=verb):
+            found.set()
+            return noun, verb
+    return None
+
+
+def solve_part_two_parallel(contents: list[int], jobs: int,
+                            target: int = REQUESTED_OUTPUT,
+                            size: Optional[int] = None) -> int:
+    """Solve part two of the puzzle searching nouns in a process pool
+
+    Each noun is a task. The program is sent once to each worker, and the
+    remaining tasks are cancelled as soon as one worker finds the target.
+    When several pairs match, any of them may be returned.
+
+    :param contents: list of integers
+    :param jobs: number of worker processes
+    :param target: requested value of the first position
+    :param size: number of noun and verb values to search
+    :return: answer for the part two of the puzzle
+    """
+    upper_bound = grid_size(contents=contents, size=size)
+    found = multiprocessing.Event()
+    pool = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                               initargs=(contents, found))
+    try:
+        futures = [pool.submit(search_noun, noun, upper_bound, target)
+                   for noun in range(upper_bound)]
+        for future in as_completed(futures):
+            pair = future.result()
+            if pair is not None:
+                noun, verb = pair
+                log.info(f'noun: {noun}, verb: {verb}')
+                answer = 100 * noun + verb
+                return answer
+    finally:
+        found.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def solve_part_two_batched(contents: list[int],
+                           target: int = REQUESTED_OUTPUT,
+                           size: Optional[int] = None) -> int:
+    """Solve part two of the puzzle running all noun and verb pairs at once
+
+    :param contents: list of integers
+    :param target: requested value of the first position
+    :param size: number of noun and verb values to search
+    :return: answer for the part two of the puzzle
+    """
+    import numpy as np
+    from common.intcode_batch import BatchComputer
+
+    upper_bound = grid_size(contents=contents, size=size)
+    pairs = np.arange(upper_bound * upper_bound)
+    images = np.tile(np.array(contents, dtype=np.int64), (len(pairs), 1))
+    images[:, 1] = pairs // upper_bound
+    images[:, 2] = pairs % upper_bound
+    batch = BatchComputer(programs=images)
+    batch.run()
+    for pair in pairs:
+        if target == batch.load(instance=pair, address=0):
+            noun, verb = divmod(int(pair), upper_bound)
+            log.info(f'noun: {noun}, verb: {verb}')
+            answer = 100 * noun + verb
+            return answer
+
+
 # Support Methods --------------------------------------------------------------
 
 
@@ -158,7 +394,22 @@ def parse_arguments() -> argparse.Namespace:
     pa('filename', type=str, help='input contents filename')
     pa('-p', '--part', type=int, help='solve only the given part')
     pa('-v', '--verbose', action='store_true', help='print extra messages')
+    pa('-b', '--batch', action='store_true',
+       help='run all Intcode instances in lockstep (requires NumPy)')
+    pa('-j', '--jobs', type=int, help='search in parallel with this many '
+                                      'worker processes')
+    pa('-s', '--symbolic', action='store_true',
+       help='solve from the symbolic expression of the first position')
+    pa('-t', '--target', type=int, default=REQUESTED_OUTPUT,
+       help='requested output value')
+    pa('-g', '--grid-size', type=int,
+       help='number of noun and verb values to search')
     arguments = parser.parse_args()
+    if arguments.grid_size is not None:
+        length = len(load_contents(filename=arguments.filename))
+        if not 1 <= arguments.grid_size <= length:
+            parser.error(f'argument -g/--grid-size: must be between 1 and '
+                         f'the program length {length}')
     return arguments
 
 
@@ -178,7 +429,19 @@ def main() -> int:
         print(answer)
     if compute_part_two:
         contents = load_contents(filename=args.filename)
-        answer = solve_part_two(contents=contents)
+        if args.batch:
+            answer = solve_part_two_batched(
+                contents=contents, target=args.target, size=args.grid_size)
+        elif args.symbolic:
+            answer = solve_part_two_symbolic(
+                contents=contents, target=args.target, size=args.grid_size)
+        elif args.jobs:
+            answer = solve_part_two_parallel(
+                contents=contents, jobs=args.jobs, target=args.target,
+                size=args.grid_size)
+        else:
+            answer = solve_part_two(contents=contents, target=args.target,
+                                    size=args.grid_size)
         print(answer)
     return EXIT_SUCCESS
 
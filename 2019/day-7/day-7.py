@@ -7,6 +7,7 @@ Puzzle Solution in Python
 """
 
 import argparse
+import asyncio
 import itertools
 import logging
 import operator
@@ -14,6 +15,10 @@ import os
 import sys
 from enum import IntEnum
 from functools import reduce
+from typing import Optional
+
+from common.intcode import Computer
+from common.intcode_scheduler import Scheduler
 
 log = logging.getLogger(__name__)
 
@@ -265,6 +270,206 @@ def solve_part_two(contents: list[int]) -> int:
     return answer
 
 
+def solve_batched(contents: list[int], phase_range: tuple,
+                  feedback: bool) -> int:
+    """Solve either part of the puzzle running every amplifier at once
+
+    :param contents: list of integers
+    :param phase_range: range of phase setting values
+    :param feedback: route the last stage output back to the first stage
+    :return: answer for the selected part of the puzzle
+    """
+    from common.intcode_batch import BatchComputer
+
+    phase_settings = list(itertools.permutations(
+        iterable=range(*phase_range), r=AMPLIFIERS))
+    programs = []
+    inputs = []
+    route = []
+    for i, phase_setting in enumerate(phase_settings):
+        first_stage = AMPLIFIERS * i
+        for amp, amp_phase_setting in enumerate(phase_setting):
+            programs.append(contents)
+            inputs.append([amp_phase_setting, 0] if amp == 0
+                          else [amp_phase_setting])
+            if amp < AMPLIFIERS - 1:
+                route.append(first_stage + amp + 1)
+            else:
+                route.append(first_stage if feedback else None)
+    batch = BatchComputer(programs=programs, inputs=inputs, route=route)
+    outputs = batch.run()
+    answer = max(outputs[AMPLIFIERS * i + AMPLIFIERS - 1][-1]
+                 for i in range(len(phase_settings)))
+    return answer
+
+
+class AmplifierNetwork:
+    """Amplifiers running as concurrent tasks, linked by input queues
+
+    Each amplifier receives its phase setting as first input, and the first
+    amplifier then receives a zero signal. Without explicit links, amplifiers
+    are chained in order and the last one is left open. The network stops
+    once every amplifier has either halted or is waiting on an empty queue.
+
+    Attributes:
+        computers -- Intcode computer per amplifier
+        inboxes -- input queue per amplifier
+        links -- amplifiers receiving the outputs of each amplifier
+        outputs -- output values per amplifier
+    """
+
+    def __init__(self, contents: list[int], phase_setting: tuple,
+                 links: Optional[dict[int, list[int]]] = None):
+        count = len(phase_setting)
+        self.computers = [Computer(program=contents, inputs=[p])
+                          for p in phase_setting]
+        self.computers[0].inputs.append(0)
+        self.inboxes = [asyncio.Queue() for _ in range(count)]
+        self.links = links if links is not None \
+            else {amp: [amp + 1] for amp in range(count - 1)}
+        self.outputs: list[list[int]] = [[] for _ in range(count)]
+        self.idle: set[int] = set()
+        self.finished: set[int] = set()
+        self.stalled = asyncio.Event()
+
+    def check_stalled(self) -> None:
+        """Flag the network as stalled if no amplifier can make progress
+
+        :return: nothing
+        """
+        if all(amp in self.finished
+               or (amp in self.idle and self.inboxes[amp].empty())
+               for amp in range(len(self.computers))):
+            self.stalled.set()
+
+    async def amplifier(self, amp: int) -> None:
+        """Run an amplifier until halt, awaiting input values from its inbox
+
+        :param amp: amplifier index
+        :return: nothing
+        """
+        computer = self.computers[amp]
+        inbox = self.inboxes[amp]
+        outboxes = [self.inboxes[d] for d in self.links.get(amp, [])]
+        try:
+            process = computer.execute()
+            value = next(process, None)
+            while not computer.halted:
+                if value is None:
+                    self.idle.add(amp)
+                    self.check_stalled()
+                    value = await inbox.get()
+                    self.idle.discard(amp)
+                    value = process.send(value)
+                else:
+                    self.outputs[amp].append(value)
+                    for outbox in outboxes:
+                        outbox.put_nowait(value)
+                    value = next(process, None)
+        finally:
+            self.finished.add(amp)
+            self.check_stalled()
+
+    async def run(self) -> list[list[int]]:
+        """Run all amplifiers until the network stalls
+
+        :return: output values per amplifier
+        """
+        tasks = [asyncio.create_task(self.amplifier(amp))
+                 for amp in range(len(self.computers))]
+        await self.stalled.wait()
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                raise result
+        return self.outputs
+
+
+async def solve_concurrent(contents: list[int], phase_range: tuple,
+                           feedback: bool) -> int:
+    """Solve either part of the puzzle running every network concurrently
+
+    :param contents: list of integers
+    :param phase_range: range of phase setting values
+    :param feedback: route the last stage output back to the first stage
+    :return: answer for the selected part of the puzzle
+    """
+    links = {amp: [(amp + 1) % AMPLIFIERS] for amp in range(AMPLIFIERS)} \
+        if feedback else None
+    phase_settings = itertools.permutations(
+        iterable=range(*phase_range), r=AMPLIFIERS)
+    networks = [AmplifierNetwork(
+        contents=contents, phase_setting=p, links=links).run()
+        for p in phase_settings]
+    outputs = await asyncio.gather(*networks)
+    answer = max(o[-1][-1] for o in outputs)
+    return answer
+
+
+def solve_scheduled(contents: list[int], phase_range: tuple,
+                    feedback: bool) -> int:
+    """Solve either part of the puzzle with every amplifier on one scheduler
+
+    :param contents: list of integers
+    :param phase_range: range of phase setting values
+    :param feedback: route the last stage output back to the first stage
+    :return: answer for the selected part of the puzzle
+    """
+    scheduler = Scheduler()
+    last_stages = []
+    for phase_setting in itertools.permutations(
+            iterable=range(*phase_range), r=AMPLIFIERS):
+        stages = [scheduler.add(program=contents, inputs=[p])
+                  for p in phase_setting]
+        for source, destination in zip(stages, stages[1:]):
+            scheduler.connect(source=source, destination=destination)
+        if feedback:
+            scheduler.connect(source=stages[-1], destination=stages[0])
+        scheduler.send(machine=stages[0], value=0)
+        last_stages.append(stages[-1])
+    outputs = scheduler.run()
+    answer = max(outputs[stage][-1] for stage in last_stages)
+    return answer
+
+
+def solve_forked(contents: list[int], phase_range: tuple,
+                 feedback: bool) -> int:
+    """Solve either part of the puzzle cloning amplifiers from snapshots
+
+    The program runs once per phase setting value until it requests the
+    input signal, and each amplifier of each permutation then resumes from
+    the snapshot of its phase setting. A program emitting outputs before
+    requesting the signal is instead restarted for each amplifier.
+
+    :param contents: list of integers
+    :param phase_range: range of phase setting values
+    :param feedback: route the last stage output back to the first stage
+    :return: answer for the selected part of the puzzle
+    """
+    primed = {}
+    for phase in range(*phase_range):
+        computer = Computer(program=contents, inputs=[phase])
+        if computer.run():
+            computer = Computer(program=contents, inputs=[phase])
+        primed[phase] = computer.snapshot()
+    amp_outputs = []
+    for phase_setting in itertools.permutations(
+            iterable=range(*phase_range), r=AMPLIFIERS):
+        amplifiers = [Computer.resume(snapshot=primed[p])
+                      for p in phase_setting]
+        signal = 0
+        while True:
+            for amplifier in amplifiers:
+                amplifier.inputs.append(signal)
+                signal = amplifier.run()[-1]
+            if not feedback or amplifiers[-1].halted:
+                break
+        amp_outputs.append(signal)
+    answer = max(amp_outputs)
+    return answer
+
+
 # Support Methods --------------------------------------------------------------
 
 
@@ -299,6 +504,17 @@ def parse_arguments() -> argparse.Namespace:
     pa('filename', type=str, help='input contents filename')
     pa('-p', '--part', type=int, help='solve only the given part')
     pa('-v', '--verbose', action='store_true', help='print extra messages')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-b', '--batch', action='store_true',
+                      help='run all Intcode instances in lockstep '
+                           '(requires NumPy)')
+    mode.add_argument('-f', '--fork', action='store_true',
+                      help='clone amplifiers from snapshots taken after the '
+                           'phase setting')
+    mode.add_argument('-s', '--scheduler', action='store_true',
+                      help='run amplifiers on a round-robin Intcode scheduler')
+    mode.add_argument('-a', '--asyncio', action='store_true',
+                      help='run amplifiers as concurrent asyncio tasks')
     arguments = parser.parse_args()
     return arguments
 
@@ -316,12 +532,42 @@ def main() -> int:
     if compute_part_one:
         contents = load_contents(filename=args.filename)
         for i, c in enumerate(contents):
-            answer = solve(contents=c)
+            if args.batch:
+                answer = solve_batched(
+                    contents=c, phase_range=PHASE_RANGE, feedback=False)
+            elif args.fork:
+                answer = solve_forked(
+                    contents=c, phase_range=PHASE_RANGE, feedback=False)
+            elif args.scheduler:
+                answer = solve_scheduled(
+                    contents=c, phase_range=PHASE_RANGE, feedback=False)
+            elif args.asyncio:
+                answer = asyncio.run(solve_concurrent(
+                    contents=c, phase_range=PHASE_RANGE, feedback=False))
+            else:
+                answer = solve(contents=c)
             print(f'part one: index {i}, answer: {answer}')
     if compute_part_two:
         contents = load_contents(filename=args.filename)
         for i, c in enumerate(contents):
-            answer = solve_part_two(contents=c)
+            if args.batch:
+                answer = solve_batched(
+                    contents=c, phase_range=PHASE_RANGE_PART_TWO,
+                    feedback=True)
+            elif args.fork:
+                answer = solve_forked(
+                    contents=c, phase_range=PHASE_RANGE_PART_TWO,
+                    feedback=True)
+            elif args.scheduler:
+                answer = solve_scheduled(
+                    contents=c, phase_range=PHASE_RANGE_PART_TWO,
+                    feedback=True)
+            elif args.asyncio:
+                answer = asyncio.run(solve_concurrent(
+                    contents=c, phase_range=PHASE_RANGE_PART_TWO,
+                    feedback=True))
+            else:
+                answer = solve_part_two(contents=c)
             print(f'part two: index {i}, answer: {answer}')
     return EXIT_SUCCESS
 
@@ -8,53 +8,22 @@ Puzzle Solution in Python
 
 import argparse
 import logging
-import os
 import sys
+import time
 
-from enum import IntEnum
-from types import SimpleNamespace as sn
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from typing import Iterator
 
-log = logging.getLogger(__name__)
-
-
-INTCODE_INSTR_MOD = 100
-DEFAULT_RAM_VALUE = 0
-ISA = {
-    1: sn(name='Add', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    2: sn(name='Mul', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    3: sn(name='In', input_args=1, load_args=0, store_args=1, output_args=0, jump=False),
-    4: sn(name='Out', input_args=0, load_args=1, store_args=0, output_args=1, jump=False),
-    5: sn(name='JNZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
-    6: sn(name='JZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
-    7: sn(name='LT', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    8: sn(name='Eq', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
-    9: sn(name='RBS', input_args=0, load_args=1, store_args=0, output_args=0, jump=False),
-    99: sn(name='Halt', input_args=0, load_args=0, store_args=0, output_args=0, jump=False),
-}
-
-
-class Error(Exception):
-    """Base class for exceptions in this module."""
-    pass
-
+from common.intcode import Computer
+from common.intcode_image import load_programs
+from common.intcode_compiler import CompiledComputer
+from common.intcode_dispatch import DispatchComputer
+from common.intcode_memo import MemoizedComputer
+from common.intcode_profile import Profile, ProfiledComputer
+from common.intcode_trace import TracedComputer
 
-class Mode(IntEnum):
-    POSITION = 0
-    IMMEDIATE = 1
-    RELATIVE = 2
-
-
-class OpcodeError(Error):
-    """Exception raised for unsupported opcode.
-
-    Attributes:
-        opcode -- opcode value
-    """
-
-    def __init__(self, opcode: int):
-        message = f'Invalid opcode {opcode}'
-        super().__init__(message)
+log = logging.getLogger(__name__)
 
 
 # Common Methods ---------------------------------------------------------------
@@ -66,251 +35,93 @@ def load_contents(filename: str) -> Iterator[list[int]]:
     :param filename: input filename
     :return: iterator yielding a list of integers
     """
-    lines = open(filename).read().strip().split(os.linesep)
-    for line in lines:
-        yield [int(token) for token in line.split(',')]
-
-
-def decode(instruction: int) -> [int, list[int]]:
-    """Decode instruction into opcode and load modes
-
-    :param instruction: instruction
-    :return: opcode and access mode per loaded arguments
-    """
-    opcode = instruction % INTCODE_INSTR_MOD
-    if opcode not in ISA:
-        raise OpcodeError(opcode=opcode)
-    args_qty = ISA[opcode].load_args + ISA[opcode].store_args
-    modes_int = instruction // INTCODE_INSTR_MOD
-    modes = [Mode(int(m)) for m in reversed(str(modes_int))]
-    leading_zero_modes = [Mode.POSITION] * (args_qty - len(modes))
-    padded_modes = modes + leading_zero_modes
-    log.debug(f'{instruction=}: {ISA[opcode].name}, {padded_modes}')
-    return opcode, padded_modes
-
-
-def fetch(
-        instruction_pointer: int,
-        load_modes: list[int],
-        ram: dict[int, int],
-        relative_base: int,
-        opcode:int,
-        input_stack: list[int]) -> list[int]:
-    """Fetch operands from memory
-
-    :param instruction_pointer: instruction operation code
-    :param load_modes: access mode per loaded arguments
-    :param ram: memory contents mapping
-    :param relative_base: relative base address value
-    :param opcode: instruction opcode
-    :param input_stack: initial input value list
-    :return: operand values
-    """
-    operands = list()
-    if ISA[opcode].input_args > 0:
-        for _ in range(ISA[opcode].input_args):
-            operands.append(input_stack.pop())
-    else:
-        for i, mode in enumerate(load_modes):
-            pointer = instruction_pointer + 1 + i
-            contents = ram[pointer]
-            if mode == Mode.IMMEDIATE:
-                operands.append(contents)
-            elif mode == Mode.POSITION:
-                operands.append(ram.get(contents, DEFAULT_RAM_VALUE))
-            elif mode == Mode.RELATIVE:
-                operands.append(ram[relative_base + contents])
-            else:
-                raise Exception
-    log.debug(f'{operands=}')
-    return operands
-
-
-def execute(opcode:int , operands: list[int]) -> int:
-    """Execute an instruction
-
-    :param opcode: instruction opcode
-    :param operands: operand values
-    :return:
-    """
-    result = None
-    if ISA[opcode].name == 'Add':
-        result = sum(operands)
-    if ISA[opcode].name == 'Mul':
-        result = operands[0] * operands[1]
-    if ISA[opcode].name == 'In':
-        result = operands[0]
-    if ISA[opcode].name == 'Out':
-        result = operands[0]
-    if ISA[opcode].name == 'LT':
-        result = 1 if operands[0] < operands[1] else 0
-    if ISA[opcode].name == 'Eq':
-        result = 1 if operands[0] == operands[1] else 0
-    if ISA[opcode].name == 'JNZ':
-        result = operands[1]
-    if ISA[opcode].name == 'JZ':
-        result = operands[1]
-    if ISA[opcode].name == 'RBS':
-        result = operands[0]
-    assert result is not None
-    log.debug(f'executed {opcode=}, {operands=}, {result=}')
-    return result
-
-
-def store(
-        opcode: int,
-        store_mode: int,
-        output: int,
-        instruction_pointer: int,
-        ram: dict[int, int],
-        relative_base: int) -> None:
-    """Store output value back into memory
-
-    :param opcode: instruction opcode
-    :param store_mode: stored operand mode
-    :param output: output after execution of the instruction
-    :param instruction_pointer: pointer to the current instruction
-    :param ram: memory contents mapping
-    :param relative_base: relative base address value
-    :return: nothing
-    """
-    no_store = ISA[opcode].store_args == 0
-    if no_store:
-        return
-    if store_mode == Mode.RELATIVE:
-        store_pointer_address = instruction_pointer + 1 + ISA[opcode].load_args
-        store_pointer = relative_base + ram.get(store_pointer_address, DEFAULT_RAM_VALUE)
-    elif store_mode == Mode.POSITION:
-        store_pointer_address = instruction_pointer + 1 + ISA[opcode].load_args
-        store_pointer = ram[store_pointer_address]
-    else:
-        raise Exception
-    ram[store_pointer] = output
-    log.debug(f'stored {output} @{store_pointer}')
-    return
-
-
-def push_output(opcode: int, output: int) -> list[int]:
-    """Push value in the output stack
-
-    :param opcode: instruction opcode
-    :param output: output after execution of the instruction
-    :return: new value to push to the output stack
-    """
-    output_ = list()
-    if ISA[opcode].name == 'Out':
-        output_.append(output)
-    return output_
-
-
-def shift_base(opcode: int, output: int) -> int:
-    """Compute relative base shift
-
-    :param opcode: instruction opcode
-    :param output: output after execution of the instruction
-    :return: relative base shift value
-    """
-    shift = 0
-    if ISA[opcode].name == 'RBS':
-        shift = output
-    return shift
-
-
-def jump_next_instruction(
-        opcode: int,
-        instruction_pointer: int,
-        operands: list[int], output: int) -> int:
-    """Compute pointer to following instruction
-
-    :param opcode: instruction opcode
-    :param instruction_pointer: pointer to the current instruction
-    :param operands: operand values
-    :param output: output after execution of the instruction
-    :return: pointer to following instruction
-    """
-    next_instruction = instruction_pointer + 1 + \
-                       ISA[opcode].load_args + ISA[opcode].store_args
-    if ISA[opcode].name in ['Add', 'Mul', 'RBS', 'LT', 'Eq', 'In', 'Out']:
-        pass
-    elif ISA[opcode].name == 'JNZ':
-        non_zero = operands[0] != 0
-        next_instruction = operands[1] if non_zero else next_instruction
-    elif ISA[opcode].name == 'JZ':
-        non_zero = operands[0] == 0
-        next_instruction = operands[1] if non_zero else next_instruction
-    else:
-        raise Exception
-    log.debug(f'{opcode=}, {next_instruction=}')
-    return next_instruction
-
-
-def execute_program(
-        ram: dict[int, int],
-        instruction_pointer: int,
-        input_stack: list[int]) -> list[int]:
-    """Execute an Intcode program stored in RAM
-
-    :param ram: memory contents mapping
-    :param instruction_pointer: initial instruction pointer value
-    :param input_stack: initial input value list
-    :return: output values
-    """
-    output_values = list()
-    relative_base = 0
-    while True:
-        instruction = ram[instruction_pointer]
-        opcode, operand_modes = decode(instruction=instruction)
-        halt = ISA[opcode].name == 'Halt'
-        if halt:
-            break
-        load_modes = operand_modes[:ISA[opcode].load_args]
-        operands = fetch(instruction_pointer=instruction_pointer,
-                         load_modes=load_modes, ram=ram,
-                         relative_base=relative_base,
-                         opcode=opcode, input_stack=input_stack)
-        output = execute(opcode=opcode, operands=operands)
-        store_mode = operand_modes[-ISA[opcode].store_args:][0]
-        store(opcode=opcode, store_mode=store_mode, output=output,
-              instruction_pointer=instruction_pointer, ram=ram,
-              relative_base=relative_base)
-        output_values.extend(push_output(opcode=opcode, output=output))
-        relative_base += shift_base(opcode=opcode, output=output)
-        next_instruction_pointer = jump_next_instruction(
-            opcode=opcode, instruction_pointer=instruction_pointer,
-            operands=operands, output=output)
-        instruction_pointer = next_instruction_pointer
-    return output_values
+    yield from load_programs(filename=filename)
 
 
 # Solver Methods ---------------------------------------------------------------
 
 
-def solve(contents: [int]) -> list[int]:
+def solve(contents: [int], computer_type: type = Computer) -> list[int]:
     """Solve puzzle part one
 
     :param contents: Intcode program
+    :param computer_type: Intcode computer backend
     :return: puzzle answer
     """
-    mem = {k: v for k, v in enumerate(contents)}
-    inputs = [1]
-    outputs = execute_program(
-        ram=mem, instruction_pointer=0, input_stack=inputs)
+    computer = computer_type(program=contents, inputs=[1])
+    outputs = computer.run()
     return outputs
 
 
-def solve_part_two(contents) -> list[int]:
+def solve_part_two(
+        contents: [int], computer_type: type = Computer) -> list[int]:
     """Solve puzzle part one
 
     :param contents: Intcode program
+    :param computer_type: Intcode computer backend
     :return: puzzle answer
     """
-    mem = {k: v for k, v in enumerate(contents)}
-    inputs = [2]
-    outputs = execute_program(
-        ram=mem, instruction_pointer=0, input_stack=inputs)
+    computer = computer_type(program=contents, inputs=[2])
+    outputs = computer.run()
     return outputs
 
 
+worker_state = {}
+
+
+def init_worker(filename: str, computer_type: type) -> None:
+    """Load the programs once in the worker process
+
+    Programs are read from the cached binary image shared by all workers,
+    instead of being pickled along with each task.
+
+    :param filename: input filename
+    :param computer_type: Intcode computer backend
+    :return: nothing
+    """
+    worker_state['programs'] = list(load_contents(filename=filename))
+    worker_state['computer_type'] = computer_type
+
+
+def solve_program(index: int, part: int) -> tuple[list[int], float]:
+    """Solve one part of the puzzle for one program of the input file
+
+    :param index: program line in the input file
+    :param part: puzzle part
+    :return: puzzle answer and wall time in seconds
+    """
+    solver = solve if part == 1 else solve_part_two
+    start = time.perf_counter()
+    answer = solver(contents=worker_state['programs'][index],
+                    computer_type=worker_state['computer_type'])
+    return answer, time.perf_counter() - start
+
+
+def solve_parallel(filename: str, parts: list[int], jobs: int,
+                   computer_type: type = Computer
+                   ) -> list[tuple[int, int, list[int], float]]:
+    """Solve the puzzle for every program and part in a process pool
+
+    Each program and part pair is a task, results are returned in input
+    order whatever the order in which they complete.
+
+    :param filename: input filename
+    :param parts: puzzle parts to solve
+    :param jobs: number of worker processes
+    :param computer_type: Intcode computer backend
+    :return: part, program index, answer and wall time per task
+    """
+    count = sum(1 for _ in load_contents(filename=filename))
+    tasks = [(part, index) for part in parts for index in range(count)]
+    chunk_size = max(1, len(tasks) // (4 * jobs))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(filename, computer_type)) as pool:
+        results = pool.map(solve_program, [i for _, i in tasks],
+                           [p for p, _ in tasks], chunksize=chunk_size)
+        return [(part, index, answer, seconds)
+                for (part, index), (answer, seconds) in zip(tasks, results)]
+
+
 # Support Methods --------------------------------------------------------------
 
 
@@ -345,7 +156,28 @@ def parse_arguments() -> argparse.Namespace:
     pa('filename', type=str, help='input contents filename')
     pa('-p', '--part', type=int, help='solve only the given part')
     pa('-v', '--verbose', action='store_true', help='print extra messages')
+    pa('-j', '--jobs', type=int,
+       help='run programs in parallel with this many worker processes')
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument('--profile', action='store_true',
+                         help='report Intcode execution statistics')
+    backend.add_argument('--trace', type=int, metavar='DEPTH',
+                         help='print the last executed Intcode instructions '
+                              'on halt or error')
+    backend.add_argument('-c', '--compile', action='store_true',
+                         help='run the Intcode basic-block compiler')
+    backend.add_argument('-d', '--dispatch', action='store_true',
+                         help='run the mode-specialized Intcode dispatch '
+                              'table')
+    backend.add_argument('-m', '--memoize', action='store_true',
+                         help='memoize calls to pure Intcode subroutines')
     arguments = parser.parse_args()
+    if arguments.trace is not None and arguments.trace < 1:
+        parser.error('argument --trace: DEPTH must be at least 1')
+    if arguments.jobs and (arguments.profile
+                           or arguments.trace is not None):
+        parser.error('argument -j/--jobs: not allowed with argument '
+                     '--profile or --trace')
     return arguments
 
 
@@ -359,14 +191,39 @@ def main() -> int:
     log.debug(f'Arguments: {args}')
     compute_part_one = not args.part or 1 == args.part
     compute_part_two = not args.part or 2 == args.part
+    profile = Profile()
+    computer_type = Computer
+    if args.compile:
+        computer_type = CompiledComputer
+    elif args.dispatch:
+        computer_type = DispatchComputer
+    elif args.memoize:
+        computer_type = MemoizedComputer
+    elif args.profile:
+        computer_type = partial(ProfiledComputer, profile=profile)
+    elif args.trace is not None:
+        computer_type = partial(TracedComputer, depth=args.trace)
+    if args.jobs:
+        parts = [part for part, selected in (
+            (1, compute_part_one), (2, compute_part_two)) if selected]
+        for part, index, answer, seconds in solve_parallel(
+                filename=args.filename, parts=parts, jobs=args.jobs,
+                computer_type=computer_type):
+            name = 'one' if part == 1 else 'two'
+            print(f'part {name}: answer: {answer} '
+                  f'(program {index}, {seconds:.6f}s)')
+        return EXIT_SUCCESS
     if compute_part_one:
         for intcode in load_contents(filename=args.filename):
-            answer = solve(contents=intcode)
+            answer = solve(contents=intcode, computer_type=computer_type)
             print(f'part one: answer: {answer}')
     if compute_part_two:
         for intcode in load_contents(filename=args.filename):
-            answer = solve_part_two(contents=intcode)
+            answer = solve_part_two(
+                contents=intcode, computer_type=computer_type)
             print(f'part two: answer: {answer}')
+    if args.profile:
+        print(profile.report())
     return EXIT_SUCCESS
 
 
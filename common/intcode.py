@@ -0,0 +1,757 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode computer shared by the 2019 edition puzzles
+"""
+
+import logging
+from collections import deque
+from enum import IntEnum
+from functools import lru_cache
+from itertools import islice
+from types import SimpleNamespace as sn
+from typing import Callable, Generator, Iterable, Iterator, NamedTuple, Optional
+
+log = logging.getLogger(__name__)
+
+INTCODE_INSTR_MOD = 100
+DEFAULT_RAM_VALUE = 0
+PAGE_SIZE = 4096
+MAX_GROWTH = 64 * PAGE_SIZE
+CHUNK_SIZE = 256
+ISA = {
+    1: sn(name='Add', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
+    2: sn(name='Mul', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
+    3: sn(name='In', input_args=1, load_args=0, store_args=1, output_args=0, jump=False),
+    4: sn(name='Out', input_args=0, load_args=1, store_args=0, output_args=1, jump=False),
+    5: sn(name='JNZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
+    6: sn(name='JZ', input_args=0, load_args=2, store_args=0, output_args=0, jump=True),
+    7: sn(name='LT', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
+    8: sn(name='Eq', input_args=0, load_args=2, store_args=1, output_args=0, jump=False),
+    9: sn(name='RBS', input_args=0, load_args=1, store_args=0, output_args=0, jump=False),
+    99: sn(name='Halt', input_args=0, load_args=0, store_args=0, output_args=0, jump=False),
+}
+ADD, MUL, IN, OUT, JNZ, JZ, LT, EQ, RBS, HALT = ISA
+HOOKED = INTCODE_INSTR_MOD
+MAX_ARGS = 3
+PREEMPTED = object()
+DECODE_CACHE_SIZE = 1024
+
+
+class Error(Exception):
+    """Base class for exceptions in this module."""
+    pass
+
+
+class Mode(IntEnum):
+    POSITION = 0
+    IMMEDIATE = 1
+    RELATIVE = 2
+
+
+class OpcodeError(Error):
+    """Exception raised for unsupported opcode.
+
+    Attributes:
+        opcode -- opcode value
+    """
+
+    def __init__(self, opcode: int):
+        message = f'Invalid opcode {opcode}'
+        super().__init__(message)
+
+
+class AddressError(Error):
+    """Exception raised for access to a negative address.
+
+    Attributes:
+        address -- memory address
+    """
+
+    def __init__(self, address: int):
+        message = f'Invalid address {address}'
+        super().__init__(message)
+
+
+class HaltOpcode(Error):
+    """Exception when an HALT opcode is encountered.
+
+    Attributes:
+        opcode -- opcode value
+    """
+
+    def __init__(self, message=''):
+        super().__init__(message)
+
+
+class Instruction(NamedTuple):
+    """Decoded instruction word"""
+    opcode: int
+    modes: tuple[Mode, ...]
+    length: int
+
+
+class Snapshot(NamedTuple):
+    """Frozen computer state
+
+    Memory is held as immutable chunks of `CHUNK_SIZE` cells indexed by
+    address divided by the chunk size. Zero-filled chunks are left out.
+    """
+    pc: int
+    rb: int
+    inputs: tuple[int, ...]
+    chunks: dict[int, tuple[int, ...]]
+
+
+WriteCallback = Callable[['Computer', int, int], None]
+ReachCallback = Callable[['Computer'], None]
+
+
+# Decoding Methods -------------------------------------------------------------
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def decode(instruction: int) -> Instruction:
+    """Decode instruction into opcode, access modes and length
+
+    Results are cached per instruction word, which backends running code
+    through `Computer.step` decode over and over.
+
+    :param instruction: instruction word
+    :return: decoded instruction record, modes are padded to three arguments
+    """
+    opcode = instruction % INTCODE_INSTR_MOD
+    if opcode not in ISA:
+        raise OpcodeError(opcode=opcode)
+    modes_int = instruction // INTCODE_INSTR_MOD
+    modes = []
+    for _ in range(MAX_ARGS):
+        modes_int, mode = divmod(modes_int, 10)
+        modes.append(Mode(mode))
+    length = 1 + ISA[opcode].load_args + ISA[opcode].store_args
+    return Instruction(opcode=opcode, modes=tuple(modes), length=length)
+
+
+# Memory -----------------------------------------------------------------------
+
+
+class Memory:
+    """Intcode memory
+
+    Cells are held in a contiguous list, padded to a whole number of pages and
+    zero-filled when a store lands less than `MAX_GROWTH` cells past its end.
+    Stores further away go into sparse pages, which are merged back into the
+    list once it grows over them.
+
+    Hot paths may index `cells` directly and fall back on `load` and `store`
+    when an `IndexError` is raised, provided they reject negative addresses
+    first since these would index the list from its end.
+    """
+
+    def __init__(self, contents: Iterable[int]):
+        self.cells = list(contents)
+        self.pages: dict[int, list[int]] = {}
+        self.grow(size=len(self.cells))
+
+    def grow(self, size: int) -> None:
+        """Extend contiguous cells to at least the given size
+
+        :param size: minimum number of contiguous cells
+        :return: nothing
+        """
+        cells = self.cells
+        size = -(-size // PAGE_SIZE) * PAGE_SIZE
+        if size <= len(cells):
+            return
+        cells.extend([DEFAULT_RAM_VALUE] * (size - len(cells)))
+        for index in [i for i in self.pages if i * PAGE_SIZE < size]:
+            base = index * PAGE_SIZE
+            cells[base:base + PAGE_SIZE] = self.pages.pop(index)
+
+    def load(self, address: int) -> int:
+        """Load value from memory
+
+        :param address: memory address
+        :return: stored value
+        """
+        if address < 0:
+            raise AddressError(address=address)
+        if address < len(self.cells):
+            return self.cells[address]
+        page = self.pages.get(address // PAGE_SIZE)
+        if page is None:
+            return DEFAULT_RAM_VALUE
+        return page[address % PAGE_SIZE]
+
+    def store(self, address: int, value: int) -> None:
+        """Store value into memory
+
+        :param address: memory address
+        :param value: value to store
+        :return: nothing
+        """
+        if address < 0:
+            raise AddressError(address=address)
+        if address >= len(self.cells):
+            if address < len(self.cells) + MAX_GROWTH:
+                self.grow(size=address + 1)
+            else:
+                index, offset = divmod(address, PAGE_SIZE)
+                page = self.pages.get(index)
+                if page is None:
+                    page = [DEFAULT_RAM_VALUE] * PAGE_SIZE
+                    self.pages[index] = page
+                page[offset] = value
+                return
+        self.cells[address] = value
+
+    def freeze(self, parent: Optional[dict[int, tuple[int, ...]]] = None
+               ) -> dict[int, tuple[int, ...]]:
+        """Get memory contents as immutable chunks
+
+        Chunks equal to those of the parent are shared instead of duplicated,
+        so that a chain of snapshots only holds the chunks written in between.
+
+        :param parent: chunks of a previous snapshot
+        :return: non-zero chunks indexed by address divided by the chunk size
+        """
+        parent = parent or {}
+        chunks = {}
+        segments = [(0, self.cells)] + [
+            (index * PAGE_SIZE, page) for index, page in self.pages.items()]
+        for base, segment in segments:
+            for offset in range(0, len(segment), CHUNK_SIZE):
+                chunk = tuple(segment[offset:offset + CHUNK_SIZE])
+                if not any(chunk):
+                    continue
+                index = (base + offset) // CHUNK_SIZE
+                shared = parent.get(index)
+                chunks[index] = shared if shared == chunk else chunk
+        return chunks
+
+    @classmethod
+    def thaw(cls, chunks: dict[int, tuple[int, ...]]) -> 'Memory':
+        """Build memory from immutable chunks
+
+        :param chunks: chunks indexed by address divided by the chunk size
+        :return: memory holding a copy of the chunks
+        """
+        memory = cls(contents=())
+        size = 0
+        contiguous = []
+        for index in sorted(chunks):
+            base = index * CHUNK_SIZE
+            if base >= size + MAX_GROWTH:
+                break
+            size = -(-(base + CHUNK_SIZE) // PAGE_SIZE) * PAGE_SIZE
+            contiguous.append(index)
+        cells = memory.cells = [DEFAULT_RAM_VALUE] * size
+        for index in contiguous:
+            base = index * CHUNK_SIZE
+            cells[base:base + CHUNK_SIZE] = chunks[index]
+        for index in sorted(set(chunks).difference(contiguous)):
+            base = index * CHUNK_SIZE
+            for offset, value in enumerate(chunks[index]):
+                memory.store(address=base + offset, value=value)
+        return memory
+
+    __getitem__ = load
+    __setitem__ = store
+
+
+# Computer ---------------------------------------------------------------------
+
+
+class Computer:
+    """Intcode computer
+
+    Instruction words are decoded once and cached per address. A cached entry
+    is only dropped when the program stores a value at that address.
+
+    The program runs inside a single generator created on first use, which
+    keeps the execution loop suspended between outputs and input requests.
+    The interpreter also caches flat records holding the addresses of the
+    operand words and of the next instruction, so that once every reachable
+    instruction was prepared an instruction allocates nothing but its result.
+
+    Callbacks may be fired by the interpreter when the program stores a value
+    at a watched address, or before it executes the instruction located at a
+    hooked address. The record of a hooked address holds the `HOOKED`
+    pseudo-opcode, so that unhooked instructions pay nothing for hooks.
+    Subclasses overriding the interpreter refuse callbacks and budgets.
+
+    Attributes:
+        budget -- jump instructions executed before the generator yields
+            `PREEMPTED`, counted again from each preemption or input request,
+            unlimited if nothing
+        image_state -- true for classes deriving state from the program
+            given to their constructor
+    """
+
+    image_state = False
+
+    def __init__(self, program: Iterable[int], inputs: Iterable[int] = ()):
+        self.memory = Memory(contents=program)
+        self.decoded: dict[int, Instruction] = {}
+        self.prepared: dict[int, tuple[int, ...]] = {}
+        self.watchpoints: dict[Optional[int], list[WriteCallback]] = {}
+        self.hooks: dict[int, list[ReachCallback]] = {}
+        self.budget: Optional[int] = None
+        self.pc = 0
+        self.rb = 0
+        self.inputs = deque(inputs)
+        self.halted = False
+        self.process: Optional[Generator] = None
+
+    def load(self, address: int) -> int:
+        """Load value from memory
+
+        :param address: memory address
+        :return: stored value
+        """
+        return self.memory.load(address=address)
+
+    def store(self, address: int, value: int) -> None:
+        """Store value into memory
+
+        :param address: memory address
+        :param value: value to store
+        :return: nothing
+        """
+        self.memory.store(address=address, value=value)
+        self.decoded.pop(address, None)
+        self.prepared.pop(address, None)
+
+    def instruction(self, address: int) -> Instruction:
+        """Get decoded instruction located at the given address
+
+        :param address: memory address
+        :return: decoded instruction record
+        """
+        instr = self.decoded.get(address)
+        if instr is None:
+            self.reach(address=address)
+            instr = decode(instruction=self.load(address))
+            self.decoded[address] = instr
+        return instr
+
+    def reach(self, address: int) -> None:
+        """Extend contiguous cells over the instruction at an address
+
+        Instructions located more than `MAX_GROWTH` cells past the contiguous
+        cells are left in sparse pages.
+
+        :param address: instruction address
+        :return: nothing
+        """
+        memory = self.memory
+        if address < len(memory.cells) + MAX_GROWTH:
+            memory.grow(size=address + 1 + MAX_ARGS)
+
+    def watch(self, address: Optional[int], callback: WriteCallback) -> None:
+        """Fire a callback each time the program stores at an address
+
+        Only stores performed by the interpreter loop are watched, not those
+        made through `store`. The callback runs after the store, and may read
+        or write memory, queue input values or alter the registers.
+
+        :param address: watched memory address, every address if nothing
+        :param callback: function taking the computer, address and value
+        :return: nothing
+        """
+        self.require_interpreter(feature='watchpoints')
+        self.watchpoints.setdefault(address, []).append(callback)
+
+    def hook(self, address: int, callback: ReachCallback) -> None:
+        """Fire a callback each time an instruction address is reached
+
+        The callback runs before the instruction, and may read or write
+        memory, queue input values or alter the registers. The instruction is
+        skipped if the instruction pointer was moved.
+
+        :param address: hooked instruction address
+        :param callback: function taking the computer
+        :return: nothing
+        """
+        self.require_interpreter(feature='hooks')
+        self.hooks.setdefault(address, []).append(callback)
+        self.prepared.pop(address, None)
+
+    def require_interpreter(self, feature: str) -> None:
+        """Check the interpreter loop of this class runs the program
+
+        Watchpoints, hooks and budgets are only honoured by this loop, so
+        that backends overriding it must refuse them.
+
+        :param feature: name of the feature requested
+        :return: nothing
+        """
+        if type(self).interpret is not Computer.interpret:
+            raise NotImplementedError(
+                f'{type(self).__name__} does not support {feature}')
+
+    def snapshot(self, parent: Optional[Snapshot] = None) -> Snapshot:
+        """Freeze the computer state
+
+        Registers are only up to date while the program is suspended, that is
+        before the first run or after a yield.
+
+        :param parent: previous snapshot sharing unchanged memory chunks
+        :return: frozen state
+        """
+        chunks = self.memory.freeze(parent=parent.chunks if parent else None)
+        return Snapshot(pc=self.pc, rb=self.rb, inputs=tuple(self.inputs),
+                        chunks=chunks)
+
+    @classmethod
+    def resume(cls, snapshot: Snapshot, **kwargs) -> 'Computer':
+        """Build a computer from a frozen state
+
+        The thawed memory is attached to a computer built without a program,
+        unless the class derives state from its program image, which is then
+        given the thawed cells.
+
+        :param snapshot: frozen state
+        :param kwargs: additional constructor arguments of the subclass
+        :return: computer ready to run from the frozen state
+        """
+        memory = Memory.thaw(chunks=snapshot.chunks)
+        if cls.image_state:
+            computer = cls(program=memory.cells, inputs=snapshot.inputs,
+                           **kwargs)
+            computer.memory.pages = memory.pages
+        else:
+            computer = cls(program=(), inputs=snapshot.inputs, **kwargs)
+            computer.memory = memory
+        computer.pc = snapshot.pc
+        computer.rb = snapshot.rb
+        return computer
+
+    def fork(self) -> 'Computer':
+        """Get an independent copy of a suspended computer
+
+        :return: computer ready to run from the current state
+        """
+        return self.resume(snapshot=self.snapshot())
+
+    def execute(self) -> Generator[Optional[int], Optional[int], None]:
+        """Get the generator executing the program
+
+        The generator yields each output value, nothing when an input is
+        required while the input queue is empty, and `PREEMPTED` when a budget
+        was given and is exhausted. A value sent into the generator is
+        appended to the input queue.
+
+        :return: program execution generator
+        """
+        if self.process is None:
+            if self.budget is not None:
+                self.require_interpreter(feature='budgets')
+            self.process = self.interpret()
+        return self.process
+
+    def run(self, outputs_limit: Optional[int] = None) -> list[int]:
+        """Execute instructions until halt, input starvation or output limit
+
+        :param outputs_limit: pause after emitting this many output values
+        :return: output values
+        """
+        outputs = []
+        for value in self.execute():
+            if value is None:
+                break
+            outputs.append(value)
+            if outputs_limit is not None and len(outputs) >= outputs_limit:
+                break
+        return outputs
+
+    def stream(self, on_input: Optional[Callable[[], int]] = None
+               ) -> Iterator[int]:
+        """Iterate over output values
+
+        Iteration stops on halt, or when an input is required and no callback
+        was given to provide it.
+
+        :param on_input: callback returning the next input value
+        :return: output values iterator
+        """
+        for value in self.execute():
+            if value is not None:
+                yield value
+            elif on_input is not None:
+                self.inputs.append(on_input())
+            else:
+                return
+
+    def records(self, arity: int,
+                on_input: Optional[Callable[[], int]] = None
+                ) -> Iterator[tuple[int, ...]]:
+        """Iterate over output records made of a fixed number of values
+
+        Iteration stops as for `stream`, and raises a `ValueError` if it
+        stops within a record.
+
+        :param arity: number of output values per record
+        :param on_input: callback returning the next input value
+        :return: output records iterator
+        """
+        values = self.stream(on_input=on_input)
+        for value in values:
+            record = (value, *islice(values, arity - 1))
+            if len(record) < arity:
+                raise ValueError(f'output stopped within a record of {arity} '
+                                 f'values: {record}')
+            yield record
+
+    def operand(self, mode: int, address: int) -> int:
+        """Get the address designated by an operand word
+
+        :param mode: operand access mode
+        :param address: address of the operand word
+        :return: designated memory address
+        """
+        pointer = self.load(address=address)
+        return pointer + self.rb if mode == Mode.RELATIVE else pointer
+
+    def step(self) -> Optional[int]:
+        """Execute the instruction located at the instruction pointer
+
+        This reference implementation is slower than the interpreter loop and
+        is meant for instrumented execution. An input instruction is left
+        unexecuted while the input queue is empty.
+
+        :return: output value, nothing for other instructions
+        """
+        pc = self.pc
+        opcode, modes, length = self.instruction(address=pc)
+        values = [self.load(address=pc + 1 + i) if mode == Mode.IMMEDIATE
+                  else self.load(address=self.operand(mode, pc + 1 + i))
+                  for i, mode in enumerate(modes[:ISA[opcode].load_args])]
+        next_pc = pc + length
+        output = None
+        if opcode == HALT:
+            self.halted = True
+            return None
+        elif opcode == IN:
+            if not self.inputs:
+                return None
+            self.store(address=self.operand(modes[0], pc + 1),
+                       value=self.inputs.popleft())
+        elif opcode == OUT:
+            output = values[0]
+        elif opcode == RBS:
+            self.rb += values[0]
+        elif opcode == JNZ:
+            next_pc = values[1] if values[0] != 0 else next_pc
+        elif opcode == JZ:
+            next_pc = values[1] if values[0] == 0 else next_pc
+        else:
+            a, b = values
+            result = {ADD: a + b, MUL: a * b, LT: int(a < b), EQ: int(a == b)}
+            self.store(address=self.operand(modes[2], pc + 3),
+                       value=result[opcode])
+        self.pc = next_pc
+        return output
+
+    def walk(self) -> Generator[Optional[int], Optional[int], bool]:
+        """Execute the instruction located at the instruction pointer
+
+        Backends run the instructions their own loop cannot handle through
+        this reference implementation, with up to date registers. The
+        instruction word is decoded again since backends may write memory
+        without dropping decoded entries.
+
+        :return: generator yielding as the interpreter does, and returning
+            true once the program is halted
+        """
+        self.decoded.pop(self.pc, None)
+        opcode = self.instruction(address=self.pc).opcode
+        if opcode == IN and not self.inputs:
+            value = yield None
+            if value is not None:
+                self.inputs.append(value)
+            return False
+        output = self.step()
+        if opcode == OUT:
+            value = yield output
+            if value is not None:
+                self.inputs.append(value)
+        return self.halted
+
+    def prepare(self, address: int) -> tuple[int, ...]:
+        """Get the interpreter record of the instruction at the given address
+
+        Hooked addresses get a record made of the `HOOKED` pseudo-opcode.
+
+        :param address: memory address
+        :return: opcode, three access modes, addresses of the three operand
+            words and of the next instruction
+        """
+        record = self.prepared.get(address)
+        if record is None:
+            if address in self.hooks:
+                record = (HOOKED, 0, 0, 0, 0, 0, 0, address)
+            else:
+                record = self.record(address=address)
+            self.prepared[address] = record
+        return record
+
+    def record(self, address: int) -> tuple[int, ...]:
+        """Build the interpreter record of the instruction at an address
+
+        :param address: memory address
+        :return: opcode, three access modes, addresses of the three operand
+            words and of the next instruction
+        """
+        opcode, (m1, m2, m3), length = self.instruction(address=address)
+        return (opcode, m1, m2, m3, address + 1, address + 2, address + 3,
+                address + length)
+
+    def interpret(self) -> Generator[Optional[int], Optional[int], None]:
+        """Interpret the program instructions
+
+        Registers are written back before each yield or callback and read
+        again afterwards, so they may be inspected or altered in between.
+
+        Stores are inlined and addresses taken from prepared records, so
+        that no temporary object is built past the result of an instruction.
+        Operand words located past the contiguous cells are loaded from the
+        sparse pages. The budget is only counted down by jumps, which bound
+        any loop.
+
+        :return: program execution generator
+        """
+        memory = self.memory
+        cells = memory.cells
+        decoded = self.decoded
+        prepared = self.prepared
+        inputs = self.inputs
+        watchpoints = self.watchpoints
+        countdown = self.budget or -1
+        pc = self.pc
+        rb = self.rb
+        immediate = Mode.IMMEDIATE
+        relative = Mode.RELATIVE
+
+        while True:
+            record = prepared.get(pc)
+            if record is None:
+                record = self.prepare(address=pc)
+            opcode, m1, m2, m3, p1, p2, p3, next_pc = record
+            if opcode >= HALT:
+                if opcode == HALT:
+                    break
+                self.pc, self.rb = pc, rb
+                for callback in self.hooks.get(pc, ()):
+                    callback(self)
+                if self.pc != pc:
+                    pc, rb = self.pc, self.rb
+                    continue
+                rb = self.rb
+                opcode, m1, m2, m3, p1, p2, p3, next_pc = self.record(
+                    address=pc)
+                if opcode == HALT:
+                    break
+            if opcode == IN:
+                if not inputs:
+                    self.pc, self.rb = pc, rb
+                    value = yield None
+                    pc, rb = self.pc, self.rb
+                    countdown = self.budget or -1
+                    if value is not None:
+                        inputs.append(value)
+                    continue
+                value = inputs.popleft()
+                try:
+                    address = cells[p1]
+                except IndexError:
+                    address = memory.load(address=p1)
+                if m1 == relative:
+                    address += rb
+            else:
+                try:
+                    a = cells[p1]
+                except IndexError:
+                    a = memory.load(address=p1)
+                if m1 != immediate:
+                    if m1 == relative:
+                        a += rb
+                    if a < 0:
+                        raise AddressError(address=a)
+                    try:
+                        a = cells[a]
+                    except IndexError:
+                        a = memory.load(address=a)
+                if opcode == OUT:
+                    self.pc, self.rb = next_pc, rb
+                    value = yield a
+                    pc, rb = self.pc, self.rb
+                    if value is not None:
+                        inputs.append(value)
+                    continue
+                if opcode == RBS:
+                    rb += a
+                    pc = next_pc
+                    continue
+                try:
+                    b = cells[p2]
+                except IndexError:
+                    b = memory.load(address=p2)
+                if m2 != immediate:
+                    if m2 == relative:
+                        b += rb
+                    if b < 0:
+                        raise AddressError(address=b)
+                    try:
+                        b = cells[b]
+                    except IndexError:
+                        b = memory.load(address=b)
+                if opcode == JNZ or opcode == JZ:
+                    if opcode == JNZ:
+                        pc = b if a != 0 else next_pc
+                    else:
+                        pc = b if a == 0 else next_pc
+                    countdown -= 1
+                    if countdown == 0:
+                        self.pc, self.rb = pc, rb
+                        value = yield PREEMPTED
+                        pc, rb = self.pc, self.rb
+                        countdown = self.budget or -1
+                        if value is not None:
+                            inputs.append(value)
+                    continue
+                if opcode == ADD:
+                    value = a + b
+                elif opcode == MUL:
+                    value = a * b
+                elif opcode == LT:
+                    value = 1 if a < b else 0
+                else:
+                    value = 1 if a == b else 0
+                try:
+                    address = cells[p3]
+                except IndexError:
+                    address = memory.load(address=p3)
+                if m3 == relative:
+                    address += rb
+            if address < 0:
+                raise AddressError(address=address)
+            try:
+                cells[address] = value
+            except IndexError:
+                memory.store(address=address, value=value)
+            prepared.pop(address, None)
+            decoded.pop(address, None)
+            pc = next_pc
+            if watchpoints and (address in watchpoints
+                                or None in watchpoints):
+                self.pc, self.rb = pc, rb
+                for callback in watchpoints.get(address, ()):
+                    callback(self, address, value)
+                for callback in watchpoints.get(None, ()):
+                    callback(self, address, value)
+                pc, rb = self.pc, self.rb
+        self.pc = pc
+        self.rb = rb
+        self.halted = True
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode baseline interpreter
+
+Reference port of the interpreter the 2019 edition puzzles used before the
+shared computer: memory is a mapping from address to value, and every
+instruction is decoded again from the digits of its word, its operands
+fetched into a list and its effects applied by opcode name. It is kept as the
+reference column of the benchmark harness and is not meant to be fast.
+"""
+
+import logging
+from typing import Generator, Iterable, Optional
+
+from common.intcode import (
+    DEFAULT_RAM_VALUE, INTCODE_INSTR_MOD, ISA, AddressError, Computer, Mode,
+    OpcodeError, Snapshot)
+
+log = logging.getLogger(__name__)
+
+
+# Decoding Methods -------------------------------------------------------------
+
+
+def decode_digits(instruction: int) -> tuple[int, list[Mode]]:
+    """Decode instruction into opcode and modes read from its decimal digits
+
+    :param instruction: instruction word
+    :return: opcode and access mode per loaded or stored argument
+    """
+    opcode = instruction % INTCODE_INSTR_MOD
+    if opcode not in ISA:
+        raise OpcodeError(opcode=opcode)
+    args_qty = ISA[opcode].load_args + ISA[opcode].store_args
+    modes_int = instruction // INTCODE_INSTR_MOD
+    modes = [Mode(int(m)) for m in reversed(str(modes_int))]
+    leading_zero_modes = [Mode.POSITION] * (args_qty - len(modes))
+    return opcode, modes + leading_zero_modes
+
+
+# Computer ---------------------------------------------------------------------
+
+
+class BaselineComputer(Computer):
+    """Intcode computer backed by a dictionary of cells
+
+    Callbacks, budgets and snapshots are not supported.
+
+    Attributes:
+        ram -- memory contents mapping
+    """
+
+    def __init__(self, program: Iterable[int], inputs: Iterable[int] = ()):
+        super().__init__(program=(), inputs=inputs)
+        self.ram: dict[int, int] = dict(enumerate(program))
+
+    def load(self, address: int) -> int:
+        """Load value from memory
+
+        :param address: memory address
+        :return: stored value
+        """
+        if address < 0:
+            raise AddressError(address=address)
+        return self.ram.get(address, DEFAULT_RAM_VALUE)
+
+    def store(self, address: int, value: int) -> None:
+        """Store value into memory
+
+        :param address: memory address
+        :param value: value to store
+        :return: nothing
+        """
+        if address < 0:
+            raise AddressError(address=address)
+        self.ram[address] = value
+
+    def snapshot(self, parent: Optional[Snapshot] = None) -> Snapshot:
+        """Refuse to capture the state of the computer
+
+        :param parent: snapshot of an earlier state
+        :return: nothing, always raises
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support snapshots')
+
+    def interpret(self) -> Generator[Optional[int], Optional[int], None]:
+        """Interpret the program instructions
+
+        :return: program execution generator
+        """
+        while True:
+            pc = self.pc
+            opcode, modes = decode_digits(instruction=self.load(address=pc))
+            isa = ISA[opcode]
+            if isa.name == 'Halt':
+                break
+            if isa.name == 'In' and not self.inputs:
+                value = yield None
+                if value is not None:
+                    self.inputs.append(value)
+                continue
+            operands = []
+            if isa.input_args > 0:
+                operands.append(self.inputs.popleft())
+            for i, mode in enumerate(modes[:isa.load_args]):
+                contents = self.load(address=pc + 1 + i)
+                if mode == Mode.IMMEDIATE:
+                    operands.append(contents)
+                elif mode == Mode.POSITION:
+                    operands.append(self.load(address=contents))
+                else:
+                    operands.append(self.load(address=self.rb + contents))
+            next_pc = pc + 1 + isa.load_args + isa.store_args
+            result = None
+            if isa.name in ('Add', 'Mul', 'LT', 'Eq'):
+                a, b = operands
+                result = {'Add': a + b, 'Mul': a * b, 'LT': int(a < b),
+                          'Eq': int(a == b)}[isa.name]
+            elif isa.name in ('In', 'Out', 'RBS'):
+                result = operands[0]
+            elif isa.name == 'JNZ' and operands[0] != 0:
+                next_pc = operands[1]
+            elif isa.name == 'JZ' and operands[0] == 0:
+                next_pc = operands[1]
+            if isa.store_args > 0:
+                pointer = self.load(address=pc + 1 + isa.load_args)
+                if modes[-1] == Mode.RELATIVE:
+                    pointer += self.rb
+                self.store(address=pointer, value=result)
+            if isa.name == 'RBS':
+                self.rb += result
+            self.pc = next_pc
+            if isa.name == 'Out':
+                value = yield result
+                if value is not None:
+                    self.inputs.append(value)
+        self.halted = True
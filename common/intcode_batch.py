@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Batched Intcode computer
+
+Many program images are held as rows of a two-dimensional NumPy array and
+advanced in lockstep, one instruction per row and per step. Rows executing
+different instructions are grouped by opcode through boolean masks. Rows
+leaving the int64 range, addressing past the array width or decoding an
+invalid instruction are moved to a scalar computer.
+
+This module requires NumPy.
+"""
+
+import logging
+from collections import deque
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from common.intcode import (
+    ADD, EQ, HALT, IN, ISA, JNZ, JZ, LT, MAX_ARGS, MUL, OUT, RBS,
+    INTCODE_INSTR_MOD, Computer, Mode)
+
+log = logging.getLogger(__name__)
+
+INT64_SAFE_LIMIT = 2 ** 62
+LENGTHS = np.zeros(INTCODE_INSTR_MOD, dtype=np.int64)
+for _opcode, _isa in ISA.items():
+    LENGTHS[_opcode] = 1 + _isa.load_args + _isa.store_args
+OPCODES = np.array(list(ISA), dtype=np.int64)
+
+
+class BatchComputer:
+    """Lockstep Intcode computer over many program images
+
+    Attributes:
+        images -- memory contents, one row per instance
+        pc -- instruction pointer per instance
+        rb -- relative base per instance
+        inputs -- input queue per instance
+        outputs -- output values per instance
+        halted -- halt flag per instance
+        computers -- scalar computers taking over instances, per instance
+    """
+
+    def __init__(self, programs: Sequence[Sequence[int]],
+                 inputs: Optional[Sequence[Iterable[int]]] = None,
+                 route: Optional[Sequence[Optional[int]]] = None,
+                 extra_cells: int = 0):
+        """Load program images
+
+        :param programs: program per instance, or a two-dimensional array
+        :param inputs: initial input values per instance
+        :param route: instance receiving the outputs of each instance
+        :param extra_cells: zero-filled cells appended to every image
+        """
+        if isinstance(programs, np.ndarray):
+            images = programs.astype(np.int64)
+        else:
+            length = max(len(p) for p in programs)
+            images = np.zeros((len(programs), length), dtype=np.int64)
+            for row, program in enumerate(programs):
+                images[row, :len(program)] = program
+        padding = np.zeros((len(images), extra_cells + MAX_ARGS + 1),
+                           dtype=np.int64)
+        self.images = np.concatenate((images, padding), axis=1)
+        count, self.width = self.images.shape
+        self.pc = np.zeros(count, dtype=np.int64)
+        self.rb = np.zeros(count, dtype=np.int64)
+        self.inputs = [deque(i) for i in inputs] if inputs \
+            else [deque() for _ in range(count)]
+        self.outputs: list[list[int]] = [[] for _ in range(count)]
+        self.route = list(route) if route else [None] * count
+        self.halted = np.zeros(count, dtype=bool)
+        self.waiting = np.zeros(count, dtype=bool)
+        self.active = np.ones(count, dtype=bool)
+        self.computers: dict[int, Computer] = {}
+
+    def load(self, instance: int, address: int) -> int:
+        """Load value from the memory of an instance
+
+        :param instance: instance index
+        :param address: memory address
+        :return: stored value
+        """
+        if instance in self.computers:
+            return self.computers[instance].load(address=address)
+        if address < self.width:
+            return int(self.images[instance, address])
+        return 0
+
+    def emit(self, instance: int, value: int) -> None:
+        """Record an output value and forward it along the route
+
+        :param instance: emitting instance index
+        :param value: output value
+        :return: nothing
+        """
+        self.outputs[instance].append(value)
+        destination = self.route[instance]
+        if destination is not None:
+            self.inputs[destination].append(value)
+            self.waiting[destination] = False
+
+    def hand_over(self, instances: Iterable[int]) -> None:
+        """Move instances to scalar computers
+
+        :param instances: instance indexes
+        :return: nothing
+        """
+        for instance in map(int, instances):
+            computer = Computer(program=self.images[instance].tolist())
+            computer.pc = int(self.pc[instance])
+            computer.rb = int(self.rb[instance])
+            computer.inputs = self.inputs[instance]
+            self.computers[instance] = computer
+            self.active[instance] = False
+            log.debug(f'instance {instance} handed over @{computer.pc}')
+
+    def step(self) -> bool:
+        """Execute one instruction on every runnable instance
+
+        :return: true if any instance was runnable
+        """
+        idx = np.flatnonzero(self.active & ~self.waiting)
+        if not idx.size:
+            return False
+        images = self.images
+        width = self.width
+        pc = self.pc[idx]
+        rb = self.rb[idx]
+        pc_ok = (pc >= 0) & (pc + MAX_ARGS < width)
+        pc = np.where(pc_ok, pc, 0)
+        words = images[idx, pc]
+        op = words % INTCODE_INSTR_MOD
+        m1 = words // 100 % 10
+        m2 = words // 1000 % 10
+        m3 = words // 10000 % 10
+        bad = ~pc_ok | (words < 0) | ~np.isin(op, OPCODES) \
+            | (m1 > Mode.RELATIVE) | (m2 > Mode.RELATIVE) | (m3 > Mode.RELATIVE)
+        p1 = images[idx, pc + 1]
+        p2 = images[idx, pc + 2]
+        p3 = images[idx, pc + 3]
+        a1 = np.where(m1 == Mode.RELATIVE, rb + p1, p1)
+        a2 = np.where(m2 == Mode.RELATIVE, rb + p2, p2)
+        a3 = np.where(m3 == Mode.RELATIVE, rb + p3, p3)
+        binary = np.isin(op, (ADD, MUL, LT, EQ))
+        access1 = (op != HALT) & (m1 != Mode.IMMEDIATE)
+        access2 = (binary | (op == JNZ) | (op == JZ)) & (m2 != Mode.IMMEDIATE)
+        for access, address in ((access1, a1), (access2, a2), (binary, a3)):
+            bad |= access & ((address < 0) | (address >= width))
+        a1 = np.clip(a1, 0, width - 1)
+        a2 = np.clip(a2, 0, width - 1)
+        a3 = np.clip(a3, 0, width - 1)
+        v1 = np.where(m1 == Mode.IMMEDIATE, p1, images[idx, a1])
+        v2 = np.where(m2 == Mode.IMMEDIATE, p2, images[idx, a2])
+        f1 = v1.astype(np.float64)
+        f2 = v2.astype(np.float64)
+        with np.errstate(over='ignore'):
+            bad |= (op == ADD) & (np.abs(f1 + f2) >= INT64_SAFE_LIMIT)
+            bad |= (op == MUL) & (np.abs(f1 * f2) >= INT64_SAFE_LIMIT)
+        reading = np.flatnonzero(~bad & (op == IN))
+        values = np.zeros(idx.size, dtype=np.int64)
+        for k in reading:
+            queue = self.inputs[idx[k]]
+            if queue:
+                values[k] = queue.popleft()
+            else:
+                self.waiting[idx[k]] = True
+                bad[k] = True
+        if bad.any():
+            self.hand_over(
+                i for i, w in zip(idx[bad], self.waiting[idx[bad]]) if not w)
+        run = ~bad
+        halt = run & (op == HALT)
+        self.halted[idx[halt]] = True
+        self.active[idx[halt]] = False
+        run &= ~halt
+        with np.errstate(over='ignore'):
+            result = np.select(
+                [op == ADD, op == MUL, op == LT, op == EQ],
+                [v1 + v2, v1 * v2, v1 < v2, v1 == v2])
+        store = run & binary
+        images[idx[store], a3[store]] = result[store]
+        read = run & (op == IN)
+        images[idx[read], a1[read]] = values[read]
+        for instance, value in zip(idx[run & (op == OUT)], v1[run & (op == OUT)]):
+            self.emit(instance=int(instance), value=int(value))
+        shift = run & (op == RBS)
+        self.rb[idx[shift]] += v1[shift]
+        next_pc = pc + LENGTHS[op]
+        taken = ((op == JNZ) & (v1 != 0)) | ((op == JZ) & (v1 == 0))
+        next_pc = np.where(taken, v2, next_pc)
+        self.pc[idx[run]] = next_pc[run]
+        return True
+
+    def run(self) -> list[list[int]]:
+        """Execute all instances until they halt or starve for inputs
+
+        :return: output values per instance
+        """
+        while True:
+            progress = False
+            while self.step():
+                progress = True
+            for instance, computer in self.computers.items():
+                pending = len(computer.inputs)
+                halted = computer.halted
+                for value in computer.run():
+                    self.emit(instance=instance, value=value)
+                    progress = True
+                if len(computer.inputs) != pending or computer.halted != halted:
+                    progress = True
+                self.halted[instance] = computer.halted
+            if not progress:
+                break
+        return self.outputs
@@ -0,0 +1,459 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode benchmark harness
+
+Runs the Intcode workloads of the 2019 edition puzzles on every available
+backend and writes wall times and peak memory as JSON. Instructions per
+second are based on a reference count of the instructions executed by the
+interpreter for the workload, so that backends doing the same work with
+fewer or more instructions are compared on equal terms. The dict-RAM
+baseline interpreter is run as a reference column where a workload passes
+its computer type through.
+
+Peak memory is measured with `tracemalloc` during an additional run, and
+does not cover worker processes.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace as sn
+from typing import Any, Callable, Iterator
+
+from common.intcode import Computer
+from common.intcode_baseline import BaselineComputer
+from common.intcode_compiler import CompiledComputer
+from common.intcode_dispatch import DispatchComputer
+from common.intcode_memo import MemoizedComputer
+from common.intcode_profile import Profile, ProfiledComputer
+from common.intcode_scheduler import Scheduler
+
+log = logging.getLogger(__name__)
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+LOG_FORMAT = '# %(msecs)-3d - %(funcName)-16s - %(levelname)-8s - %(message)s'
+PUZZLES = Path(__file__).resolve().parent.parent / '2019'
+WARMUP = 1
+REPEATS = 3
+RING_SIZES = (10, 100, 1000)
+STEADY_MEMORY = 64 * 1024
+
+
+# Workload Methods -------------------------------------------------------------
+
+
+def load_day(day: int) -> Any:
+    """Import the solution script of the given day
+
+    :param day: puzzle day
+    :return: script module
+    """
+    name = f'day_{day}'
+    if name not in sys.modules:
+        path = PUZZLES / f'day-{day}' / f'day-{day}.py'
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def run_amplifiers(contents: list[int], phase_setting: tuple, feedback: bool,
+                   computer_type: Callable = Computer) -> int:
+    """Run a chain of amplifiers, looping back to the first one if requested
+
+    :param contents: amplifier program
+    :param phase_setting: phase setting per amplifier
+    :param feedback: route the last stage output back to the first stage
+    :param computer_type: Intcode computer backend
+    :return: last output of the last amplifier
+    """
+    amplifiers = [computer_type(program=contents, inputs=[p])
+                  for p in phase_setting]
+    signal = 0
+    while True:
+        for amplifier in amplifiers:
+            amplifier.inputs.append(signal)
+            signal = amplifier.run()[-1]
+        if not feedback or amplifiers[-1].halted:
+            return signal
+
+
+def sweep_amplifiers(contents: list[int],
+                     computer_type: Callable = Computer) -> tuple[int, int]:
+    """Solve both parts of day 7 with computers of the given type
+
+    :param contents: amplifier program
+    :param computer_type: Intcode computer backend
+    :return: highest signals without and with feedback
+    """
+    day = load_day(day=7)
+    answers = []
+    for phase_range, feedback in ((day.PHASE_RANGE, False),
+                                  (day.PHASE_RANGE_PART_TWO, True)):
+        answers.append(max(
+            run_amplifiers(contents=contents, phase_setting=p,
+                           feedback=feedback, computer_type=computer_type)
+            for p in itertools.permutations(range(*phase_range))))
+    return answers[0], answers[1]
+
+
+def run_ring(contents: list[int], phase_setting: tuple) -> int:
+    """Run a feedback ring of amplifiers on the round-robin scheduler
+
+    :param contents: amplifier program
+    :param phase_setting: phase setting per amplifier
+    :return: last output of the last amplifier
+    """
+    scheduler = Scheduler()
+    ring = [scheduler.add(program=contents, inputs=[p]) for p in phase_setting]
+    for source, destination in zip(ring, ring[1:] + ring[:1]):
+        scheduler.connect(source=source, destination=destination)
+    scheduler.send(machine=ring[0], value=0)
+    return scheduler.run()[ring[-1]][-1]
+
+
+def search_grid(contents: list[int],
+                computer_type: Callable = Computer) -> int:
+    """Solve part two of day 2 with computers of the given type
+
+    :param contents: gravity assist program
+    :param computer_type: Intcode computer backend
+    :return: puzzle answer
+    """
+    day = load_day(day=2)
+    for noun in range(100):
+        for verb in range(100):
+            program = day.patch(program=contents.copy(), noun=noun, verb=verb)
+            computer = computer_type(program=program)
+            computer.run()
+            if computer.load(address=0) == day.REQUESTED_OUTPUT:
+                return 100 * noun + verb
+
+
+def build_workloads() -> dict[str, sn]:
+    """Describe workloads with their reference run and backends
+
+    :return: workloads indexed by name
+    """
+    day_2 = load_day(day=2)
+    day_7 = load_day(day=7)
+    day_9 = load_day(day=9)
+    day_13 = load_day(day=13)
+    boost = next(day_9.load_contents(PUZZLES / 'day-9' / 'input.txt'))
+    arcade = next(day_13.load_contents(PUZZLES / 'day-13' / 'input.txt'))
+    amplifier = day_7.load_contents(PUZZLES / 'day-7' / 'input.txt')[0]
+    gravity = day_2.load_contents(PUZZLES / 'day-2' / 'input.txt')
+
+    def both_parts(solver: Callable, **kwargs) -> tuple:
+        return tuple(solver(contents=amplifier, phase_range=phase_range,
+                            feedback=feedback, **kwargs)
+                     for phase_range, feedback in (
+                         (day_7.PHASE_RANGE, False),
+                         (day_7.PHASE_RANGE_PART_TWO, True)))
+
+    rings = {}
+    for size in RING_SIZES:
+        phases = tuple(itertools.islice(
+            itertools.cycle(range(*day_7.PHASE_RANGE_PART_TWO)), size))
+        rings[f'scheduler-ring-{size}'] = sn(
+            reference=partial(
+                lambda p, t: run_amplifiers(amplifier, p, True, t), phases),
+            backends={
+                'interpreter': partial(
+                    lambda p: run_amplifiers(amplifier, p, True), phases),
+                'scheduler': partial(
+                    lambda p: run_ring(amplifier, p), phases),
+            })
+
+    return rings | {
+        'day-9-part-two': sn(
+            reference=lambda t: day_9.solve_part_two(boost, t),
+            backends={
+                'baseline': lambda: day_9.solve_part_two(
+                    boost, BaselineComputer),
+                'interpreter': lambda: day_9.solve_part_two(boost),
+                'compiled': lambda: day_9.solve_part_two(
+                    boost, CompiledComputer),
+                'memoized': lambda: day_9.solve_part_two(
+                    boost, MemoizedComputer),
+                'dispatch': lambda: day_9.solve_part_two(
+                    boost, DispatchComputer),
+            }),
+        'day-13-part-two': sn(
+            reference=lambda t: day_13.solve_part_two(arcade.copy(), t),
+            backends={
+                'baseline': lambda: day_13.solve_part_two(
+                    arcade.copy(), BaselineComputer),
+                'interpreter': lambda: day_13.solve_part_two(arcade.copy()),
+                'compiled': lambda: day_13.solve_part_two(
+                    arcade.copy(), CompiledComputer),
+                'dispatch': lambda: day_13.solve_part_two(
+                    arcade.copy(), DispatchComputer),
+            }),
+        'day-7-sweep': sn(
+            reference=lambda t: sweep_amplifiers(amplifier, t),
+            backends={
+                'script': lambda: (day_7.solve(amplifier),
+                                   day_7.solve_part_two(amplifier)),
+                'interpreter': lambda: sweep_amplifiers(amplifier),
+                'dispatch': lambda: sweep_amplifiers(
+                    amplifier, DispatchComputer),
+                'batched': lambda: both_parts(day_7.solve_batched),
+                'forked': lambda: both_parts(day_7.solve_forked),
+                'asyncio': lambda: both_parts(
+                    lambda **kwargs: asyncio.run(
+                        day_7.solve_concurrent(**kwargs))),
+            }),
+        'day-2-grid': sn(
+            reference=lambda t: search_grid(gravity, t),
+            backends={
+                'script': lambda: day_2.solve_part_two(gravity),
+                'interpreter': lambda: search_grid(gravity),
+                'compiled': lambda: search_grid(gravity, CompiledComputer),
+                'dispatch': lambda: search_grid(gravity, DispatchComputer),
+                'batched': lambda: day_2.solve_part_two_batched(gravity),
+                'parallel': lambda: day_2.solve_part_two_parallel(
+                    gravity, jobs=os.cpu_count()),
+                'symbolic': lambda: day_2.solve_part_two_symbolic(gravity),
+            }),
+    }
+
+
+def play_arcade(computer: Computer) -> Iterator[Any]:
+    """Play the day 13 game, the paddle following the ball
+
+    :param computer: Intcode computer running the game with coins inserted
+    :return: iterator yielding the screen once a first block was broken, and
+        at the end of the game
+    """
+    screen = load_day(day=13).Screen()
+
+    def joystick() -> int:
+        return (screen.ball > screen.paddle) - (screen.ball < screen.paddle)
+
+    tiles = computer.records(arity=3, on_input=joystick)
+    for x, y, tile in tiles:
+        screen.draw(x=x, y=y, tile=tile)
+        if screen.score:
+            break
+    yield screen
+    for x, y, tile in tiles:
+        screen.draw(x=x, y=y, tile=tile)
+    yield screen
+
+
+# Measurement Methods ----------------------------------------------------------
+
+
+def count_instructions(workload: sn) -> int:
+    """Count instructions executed by the reference run of a workload
+
+    :param workload: workload description
+    :return: number of executed instructions
+    """
+    profile = Profile()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        workload.reference(partial(ProfiledComputer, profile=profile))
+    return sum(profile.instructions.values())
+
+
+def measure(run: Callable, warmup: int, repeats: int) -> dict:
+    """Measure wall times and peak memory of a backend run
+
+    Messages printed by the solvers are discarded.
+
+    :param run: backend run
+    :param warmup: number of untimed runs
+    :param repeats: number of timed runs
+    :return: answer, wall times in seconds and peak memory in bytes
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        return measure_quietly(run=run, warmup=warmup, repeats=repeats)
+
+
+def measure_quietly(run: Callable, warmup: int, repeats: int) -> dict:
+    """Measure wall times and peak memory of a backend run
+
+    :param run: backend run
+    :param warmup: number of untimed runs
+    :param repeats: number of timed runs
+    :return: answer, wall times in seconds and peak memory in bytes
+    """
+    for _ in range(warmup):
+        run()
+    times = []
+    answer = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        answer = run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'answer': repr(answer), 'times': times, 'best': min(times),
+            'mean': sum(times) / len(times), 'peak_memory': peak}
+
+
+def steady_allocations(computer_type: Callable = Computer) -> dict:
+    """Measure memory allocated by a computer past the first broken block
+
+    Instructions prepared or values stored for the first time may still
+    allocate memory, but the amount must not grow with the number of
+    executed instructions: a single object kept per instruction would
+    exceed `STEADY_MEMORY` within a few thousand instructions. Int objects
+    holding results replace the previous cell value and do not add up.
+
+    :param computer_type: Intcode computer backend
+    :return: instructions traced, retained and peak memory in bytes
+    """
+    arcade = next(load_day(day=13).load_contents(
+        PUZZLES / 'day-13' / 'input.txt'))
+    arcade[0] = 2
+    profile = Profile()
+    frames = play_arcade(computer=ProfiledComputer(
+        program=arcade, profile=profile))
+    next(frames)
+    start = sum(profile.instructions.values())
+    next(frames)
+    instructions = sum(profile.instructions.values()) - start
+    frames = play_arcade(computer=computer_type(program=arcade))
+    next(frames)
+    tracemalloc.start()
+    try:
+        screen = next(frames)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'score': screen.score, 'instructions': instructions,
+            'retained_memory': retained, 'peak_memory': peak,
+            'bytes_per_instruction': peak / instructions}
+
+
+def benchmark(names: list[str], backends: list[str], warmup: int,
+              repeats: int) -> dict:
+    """Run the selected workloads on the selected backends
+
+    :param names: workload names, all if empty
+    :param backends: backend names, all if empty
+    :param warmup: number of untimed runs per backend
+    :param repeats: number of timed runs per backend
+    :return: benchmark report
+    """
+    workloads = build_workloads()
+    results = []
+    for name, workload in workloads.items():
+        if names and name not in names:
+            continue
+        instructions = count_instructions(workload=workload)
+        log.info(f'{name}: {instructions} reference instructions')
+        for backend, run in workload.backends.items():
+            if backends and backend not in backends:
+                continue
+            result = {'workload': name, 'backend': backend,
+                      'instructions': instructions}
+            try:
+                result.update(measure(run=run, warmup=warmup, repeats=repeats))
+                result['instructions_per_second'] = \
+                    instructions / result['best']
+            except ImportError as error:
+                log.warning(f'{name} on {backend} skipped: {error}')
+                result['error'] = str(error)
+            log.info(f'{name} on {backend}: {result.get("best")}')
+            results.append(result)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'warmup': warmup,
+        'repeats': repeats,
+        'results': results,
+    }
+
+
+# Support Methods --------------------------------------------------------------
+
+
+def configure_logger(verbose: bool):
+    """Configure logging
+
+    :param verbose: display debug and info messages
+    :return: nothing
+    """
+    logger = logging.getLogger()
+    logger.handlers = []
+    stderr = logging.StreamHandler(sys.stderr)
+    stderr.setLevel(level=logging.WARNING)
+    stderr.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(stderr)
+    if verbose:
+        stderr.setLevel(level=logging.INFO)
+        logger.setLevel(level=logging.INFO)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse arguments provided by the command-line
+
+    :return: list of decoded arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    pa = parser.add_argument
+    pa('-w', '--workload', action='append', default=[],
+       help='run only the given workload, may be repeated')
+    pa('-b', '--backend', action='append', default=[],
+       help='run only the given backend, may be repeated')
+    pa('--warmup', type=int, default=WARMUP, help='untimed runs per backend')
+    pa('-r', '--repeats', type=int, default=REPEATS,
+       help='timed runs per backend')
+    pa('-o', '--output', type=str, help='JSON report filename')
+    pa('-a', '--allocations', action='store_true',
+       help='check the interpreter allocates nothing per instruction')
+    pa('-v', '--verbose', action='store_true', help='print extra messages')
+    arguments = parser.parse_args()
+    return arguments
+
+
+def main() -> int:
+    """Script main method
+
+    :return: script exit code returned to the shell
+    """
+    args = parse_arguments()
+    configure_logger(verbose=args.verbose)
+    if args.allocations:
+        report = steady_allocations()
+        print(json.dumps(report, indent=2))
+        if report['peak_memory'] > STEADY_MEMORY:
+            log.error(f'{report["peak_memory"]} bytes allocated over '
+                      f'{report["instructions"]} instructions')
+            return EXIT_FAILURE
+        return EXIT_SUCCESS
+    report = benchmark(names=args.workload, backends=args.backend,
+                       warmup=args.warmup, repeats=args.repeats)
+    contents = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(contents + '\n')
+    else:
+        print(contents)
+    return EXIT_SUCCESS
+
+
+if __name__ == "__main__":
+    sys.exit(main())
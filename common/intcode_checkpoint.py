@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode machine checkpoints
+
+A checkpoint holds a computer snapshot, that is its registers, non-zero
+memory chunks and pending input values, along with output values not yet
+consumed by the controller. It is serialized as native 64-bit integers
+compressed with zlib, small enough to be written during long runs or sent to
+worker processes.
+
+The payload holds the format version, the registers, the queue lengths and
+the number of chunks, then the input values, the output values, the chunk
+indexes and the chunk values. Values outside of the 64-bit range raise an
+`OverflowError`.
+"""
+
+import logging
+import os
+import zlib
+from array import array
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable
+
+from common.intcode import CHUNK_SIZE, Computer, Snapshot
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'ICKP'
+VERSION = 1
+HEADER_SIZE = 6
+
+
+class CheckpointError(Exception):
+    """Exception raised for unreadable checkpoints."""
+    pass
+
+
+# Serialization Methods --------------------------------------------------------
+
+
+def dumps(snapshot: Snapshot, outputs: Iterable[int] = ()) -> bytes:
+    """Serialize a snapshot with pending output values
+
+    :param snapshot: frozen computer state
+    :param outputs: output values not consumed yet
+    :return: checkpoint contents
+    """
+    outputs = tuple(outputs)
+    indexes = sorted(snapshot.chunks)
+    payload = array('q', [VERSION, snapshot.pc, snapshot.rb,
+                          len(snapshot.inputs), len(outputs), len(indexes)])
+    payload.extend(snapshot.inputs)
+    payload.extend(outputs)
+    payload.extend(indexes)
+    for index in indexes:
+        payload.extend(snapshot.chunks[index])
+    return MAGIC + zlib.compress(payload.tobytes())
+
+
+def loads(contents: bytes) -> tuple[Snapshot, tuple[int, ...]]:
+    """Deserialize a snapshot with pending output values
+
+    :param contents: checkpoint contents
+    :return: frozen computer state and output values not consumed yet
+    """
+    if not contents.startswith(MAGIC):
+        raise CheckpointError('Not an Intcode checkpoint')
+    try:
+        payload = array('q', zlib.decompress(contents[len(MAGIC):]))
+    except (zlib.error, ValueError) as error:
+        raise CheckpointError(f'Corrupted checkpoint: {error}') from error
+    if len(payload) < HEADER_SIZE:
+        raise CheckpointError('Truncated checkpoint header')
+    version, pc, rb, inputs_count, outputs_count, chunks_count = \
+        payload[:HEADER_SIZE]
+    if version != VERSION:
+        raise CheckpointError(f'Unsupported checkpoint version {version}')
+    if min(pc, inputs_count, outputs_count, chunks_count) < 0:
+        raise CheckpointError('Corrupted checkpoint header')
+    offset = HEADER_SIZE
+    inputs = tuple(payload[offset:offset + inputs_count])
+    offset += inputs_count
+    outputs = tuple(payload[offset:offset + outputs_count])
+    offset += outputs_count
+    indexes = payload[offset:offset + chunks_count]
+    offset += chunks_count
+    if len(payload) != offset + chunks_count * CHUNK_SIZE:
+        raise CheckpointError('Truncated checkpoint')
+    if any(index < 0 for index in indexes):
+        raise CheckpointError('Corrupted checkpoint chunk index')
+    chunks = {}
+    for index in indexes:
+        chunks[index] = tuple(payload[offset:offset + CHUNK_SIZE])
+        offset += CHUNK_SIZE
+    return Snapshot(pc=pc, rb=rb, inputs=inputs, chunks=chunks), outputs
+
+
+def restore(snapshot: Snapshot, computer_type: Callable = Computer) -> Computer:
+    """Build a computer of any type from a frozen state
+
+    The computer type is either a `Computer` subclass or a partial
+    application of one with keyword arguments, which are passed on to
+    `Computer.resume`.
+
+    :param snapshot: frozen computer state
+    :param computer_type: Intcode computer backend
+    :return: computer ready to run from the frozen state
+    """
+    if isinstance(computer_type, partial):
+        return computer_type.func.resume(snapshot=snapshot,
+                                         **computer_type.keywords)
+    return computer_type.resume(snapshot=snapshot)
+
+
+# File Methods -----------------------------------------------------------------
+
+
+def save_checkpoint(path: str, computer: Computer,
+                    outputs: Iterable[int] = ()) -> None:
+    """Write a checkpoint of a suspended computer
+
+    The file is replaced atomically, so that an interrupted write leaves the
+    previous checkpoint in place.
+
+    :param path: checkpoint filename
+    :param computer: computer suspended on an input or output
+    :param outputs: output values not consumed yet
+    :return: nothing
+    """
+    path = Path(path)
+    contents = dumps(snapshot=computer.snapshot(), outputs=outputs)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}')
+    temporary.write_bytes(contents)
+    os.replace(temporary, path)
+    log.debug(f'Saved {len(contents)} bytes checkpoint to {path}')
+
+
+def load_checkpoint(path: str, computer_type: Callable = Computer
+                    ) -> tuple[Computer, tuple[int, ...]]:
+    """Resume a computer from a checkpoint file
+
+    :param path: checkpoint filename
+    :param computer_type: Intcode computer backend
+    :return: computer ready to run and output values not consumed yet
+    """
+    try:
+        snapshot, outputs = loads(contents=Path(path).read_bytes())
+    except CheckpointError as error:
+        raise CheckpointError(f'{path}: {error}') from error
+    log.debug(f'Loaded checkpoint from {path} at pc {snapshot.pc}')
+    return restore(snapshot=snapshot, computer_type=computer_type), outputs
@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode basic-block compiler
+
+Straight-line runs of instructions are translated into Python functions and
+cached by entry address. A block ends after a jump or an output instruction,
+and before an input, a halt or an invalid opcode, which are left to the run
+loop.
+
+Compiled blocks, volatile words and entry run counts are shared by the
+computers started from the same program image, such as the amplifiers of a chain. A block is taken
+from another computer only if the words folded into its code still hold the
+same values.
+
+Compiling a block costs as much as interpreting thousands of instructions,
+so that code is only compiled once it is reached again, and code which keeps
+being overwritten is left to the interpreter.
+"""
+
+import logging
+from collections import Counter
+from typing import Callable, Generator, Iterable, Optional, Union
+
+from common.intcode import (
+    ADD, EQ, HALT, IN, INTCODE_INSTR_MOD, JNZ, JZ, LT, MUL, OUT, RBS, Computer,
+    Mode, OpcodeError, decode)
+
+log = logging.getLogger(__name__)
+
+MAX_BLOCK_INSTRUCTIONS = 64
+MAX_SHARED_IMAGES = 16
+MIN_ENTRY_RUNS = 2
+MAX_INVALIDATIONS = 2
+BINARY_OPERATORS = {ADD: '{a} + {b}', MUL: '{a} * {b}',
+                    LT: '1 if {a} < {b} else 0', EQ: '1 if {a} == {b} else 0'}
+
+
+class Block:
+    """Compiled basic block
+
+    Attributes:
+        start -- address of the first instruction
+        end -- address following the last instruction word
+        instructions -- addresses of the instruction words
+        constants -- addresses of words folded into the generated code
+        values -- values of the folded words
+        function -- compiled code taking the relative base and the computer
+            state, and returning (pc, rb)
+        source -- generated Python source
+    """
+
+    def __init__(self, start: int, end: int, instructions: list[int],
+                 constants: list[int], values: tuple[int, ...],
+                 function: Callable, source: str):
+        self.start = start
+        self.end = end
+        self.instructions = instructions
+        self.constants = constants
+        self.values = values
+        self.function = function
+        self.source = source
+
+
+SharedCode = tuple[dict[int, Block], set[int], Counter]
+shared_code: dict[tuple[int, ...], SharedCode] = {}
+
+
+# Code Generation Methods ------------------------------------------------------
+
+
+def emit_address(lines: list[str], mode: int, word: Union[int, str]) -> None:
+    """Emit statements setting x to an operand address within a try block
+
+    The caller completes the block and handles an `IndexError`. A negative address raises an `IndexError`, as an address past the
+    contiguous cells does, so that the fallback reports it. The test is left
+    out for folded position-mode words, which are checked when compiling.
+
+    :param lines: generated source lines
+    :param mode: operand access mode
+    :param word: folded operand word, or operand word expression
+    :return: nothing
+    """
+    address = f'rb + {word}' if mode == Mode.RELATIVE else word
+    lines.extend([f'x = {address}', 'try:'])
+    if not isinstance(address, int) or address < 0:
+        lines.extend(['    if x < 0:', '        raise IndexError(x)'])
+
+
+def emit_load(lines: list[str], name: str, mode: int,
+              word: Union[int, str]) -> None:
+    """Emit statements loading an operand into a local variable
+
+    :param lines: generated source lines
+    :param name: local variable name
+    :param mode: operand access mode
+    :param word: folded operand word, or operand word expression
+    :return: nothing
+    """
+    if mode == Mode.IMMEDIATE:
+        lines.append(f'{name} = {word}')
+        return
+    emit_address(lines=lines, mode=mode, word=word)
+    lines.extend([
+        f'    {name} = cells[x]',
+        'except IndexError:',
+        f'    {name} = load(x)'])
+
+
+def emit_store(lines: list[str], value: str, mode: int,
+               word: Union[int, str], next_pc: int) -> None:
+    """Emit statements storing a value, leaving the block on a code write
+
+    :param lines: generated source lines
+    :param value: value expression
+    :param mode: destination access mode
+    :param word: folded destination word, or destination word expression
+    :param next_pc: address of the following instruction
+    :return: nothing
+    """
+    mode = Mode.RELATIVE if mode == Mode.RELATIVE else Mode.POSITION
+    emit_address(lines=lines, mode=mode, word=word)
+    lines.extend([
+        f'    cells[x] = {value}',
+        '    if codemap[x]:',
+        '        invalidate(x)',
+        f'        return {next_pc}, rb',
+        'except IndexError:',
+        f'    if store(x, {value}):',
+        f'        return {next_pc}, rb'])
+
+
+def generate(cells: list[int], start: int, volatile: set[int]) -> Optional[
+        tuple[int, list[int], list[int], str]]:
+    """Generate Python source for the basic block starting at an address
+
+    Operand words are folded as constants, except for those listed as volatile
+    which are read from memory each time the block runs.
+
+    :param cells: contiguous memory cells
+    :param start: address of the first instruction
+    :param volatile: addresses of operand words rewritten by the program
+    :return: end address, instruction addresses, folded word addresses and
+        function source, nothing if the block is empty
+    """
+    lines = []
+    instructions = []
+    constants = []
+    pc = start
+    for _ in range(MAX_BLOCK_INSTRUCTIONS):
+        if pc + 3 >= len(cells):
+            break
+        try:
+            opcode, (m1, m2, m3), length = decode(instruction=cells[pc])
+        except (OpcodeError, ValueError):
+            break
+        if opcode in (IN, HALT):
+            break
+        instructions.append(pc)
+        constants.append(pc)
+        words = []
+        for address in range(pc + 1, pc + length):
+            if address in volatile:
+                words.append(f'cells[{address}]')
+            else:
+                words.append(cells[address])
+                constants.append(address)
+        next_pc = pc + length
+        lines.append(f'# {pc}: {cells[pc:next_pc]}')
+        emit_load(lines, 'a', m1, words[0])
+        pc = next_pc
+        if opcode == OUT:
+            lines.extend(['outputs.append(a)', f'return {next_pc}, rb'])
+            break
+        if opcode == RBS:
+            lines.append('rb += a')
+            continue
+        emit_load(lines, 'b', m2, words[1])
+        if opcode == JNZ:
+            lines.append(f'return (b if a != 0 else {next_pc}), rb')
+            break
+        if opcode == JZ:
+            lines.append(f'return (b if a == 0 else {next_pc}), rb')
+            break
+        lines.append('v = ' + BINARY_OPERATORS[opcode].format(a='a', b='b'))
+        emit_store(lines, 'v', m3, words[2], next_pc)
+    if not instructions:
+        return None
+    if not lines[-1].startswith('return'):
+        lines.append(f'return {pc}, rb')
+    body = '\n'.join('    ' + line for line in lines)
+    source = (f'def block_{start}(rb, outputs, cells, codemap, load, store, '
+              f'invalidate):\n{body}\n')
+    return pc, instructions, constants, source
+
+
+# Computer ---------------------------------------------------------------------
+
+
+class CompiledComputer(Computer):
+    """Intcode computer executing compiled basic blocks
+
+    Each compiled block marks the words folded into its code in a code map,
+    and is listed as an owner of these words. A store to a marked address
+    drops the blocks owning that address and leaves the running block before
+    its next instruction. Operand words hit this way are then treated as
+    volatile and read from memory by the blocks compiled afterwards, so that
+    programs patching their own operands do not trigger a recompilation on
+    every pass.
+
+    An entry address is interpreted until it is reached `MIN_ENTRY_RUNS`
+    times by the computers started from the same program image, and for good
+    once the blocks covering its instruction were
+    dropped `MAX_INVALIDATIONS` times.
+
+    Attributes:
+        blocks -- compiled block per entry address
+        shared -- blocks compiled from the same program image by any computer
+        volatile -- addresses of operand words rewritten by any computer
+            started from the same program image
+        owners -- entry addresses of the blocks folding each marked address
+        codemap -- non-zero for each address folded into a compiled block
+        runs -- times each entry address without a block was reached by
+            any computer started from the same program image
+        invalidations -- times each instruction address was covered by a
+            dropped block
+    """
+
+    image_state = True
+
+    def __init__(self, program: Iterable[int], inputs: Iterable[int] = ()):
+        program = tuple(program)
+        super().__init__(program=program, inputs=inputs)
+        self.blocks: dict[int, Block] = {}
+        self.shared, self.volatile, self.runs = self.image_code(image=program)
+        self.owners: dict[int, list[int]] = {}
+        self.codemap = bytearray(len(self.memory.cells))
+        self.invalidations: Counter = Counter()
+
+    @staticmethod
+    def image_code(image: tuple[int, ...]) -> SharedCode:
+        """Get the code shared by the computers started from an image
+
+        The least recently used image is forgotten when too many images are
+        cached.
+
+        :param image: program image
+        :return: shared block per entry address, volatile words and entry
+            run counts
+        """
+        shared = shared_code.pop(image, None)
+        if shared is None:
+            shared = {}, set(), Counter()
+            if len(shared_code) >= MAX_SHARED_IMAGES:
+                del shared_code[next(iter(shared_code))]
+        shared_code[image] = shared
+        return shared
+
+    def sync_codemap(self) -> None:
+        """Extend code map to cover all contiguous cells
+
+        :return: nothing
+        """
+        missing = len(self.memory.cells) - len(self.codemap)
+        if missing > 0:
+            self.codemap.extend(bytes(missing))
+
+    def invalidate(self, address: int) -> None:
+        """Drop compiled blocks folding an address
+
+        :param address: written memory address
+        :return: nothing
+        """
+        stale = [self.blocks.pop(start)
+                 for start in self.owners.pop(address, [])]
+        for block in stale:
+            for constant in block.constants:
+                owners = self.owners.get(constant)
+                if owners is None:
+                    continue
+                owners.remove(block.start)
+                if not owners:
+                    del self.owners[constant]
+                    self.codemap[constant] = 0
+            if address not in block.instructions:
+                self.volatile.add(address)
+            self.invalidations.update(block.instructions)
+        self.codemap[address] = 0
+        log.debug(f'invalidated {len(stale)} blocks on write @{address}')
+
+    def store(self, address: int, value: int) -> None:
+        """Store value into memory
+
+        :param address: memory address
+        :param value: value to store
+        :return: nothing
+        """
+        self.store_code(address=address, value=value)
+
+    def store_code(self, address: int, value: int) -> bool:
+        """Store value into memory, dropping blocks compiled from it
+
+        :param address: memory address
+        :param value: value to store
+        :return: true if compiled code was overwritten
+        """
+        self.memory.store(address=address, value=value)
+        self.decoded.pop(address, None)
+        self.sync_codemap()
+        hit = address < len(self.codemap) and self.codemap[address]
+        if hit:
+            self.invalidate(address=address)
+        return bool(hit)
+
+    def adopt(self, block: Block) -> None:
+        """Mark the words folded into a block as owned by this computer
+
+        :param block: compiled block
+        :return: nothing
+        """
+        for constant in block.constants:
+            self.codemap[constant] = 1
+            self.owners.setdefault(constant, []).append(block.start)
+        self.blocks[block.start] = block
+
+    def compile_block(self, address: int) -> Optional[Block]:
+        """Get the basic block starting at the given address
+
+        A block shared by another computer is reused when its folded words
+        match the memory, and compiled otherwise if the entry address is hot
+        and stable enough.
+
+        :param address: address of the first instruction
+        :return: compiled block, nothing if the instruction is not compilable
+        """
+        self.reach(address=address)
+        self.sync_codemap()
+        cells = self.memory.cells
+        if address >= len(cells) or \
+                cells[address] % INTCODE_INSTR_MOD in (IN, HALT):
+            return None
+        block = self.shared.get(address)
+        if block is not None and all(
+                cells[c] == v for c, v in zip(block.constants, block.values)):
+            self.adopt(block=block)
+            return block
+        if self.invalidations[address] >= MAX_INVALIDATIONS:
+            return None
+        self.runs[address] += 1
+        if self.runs[address] < MIN_ENTRY_RUNS:
+            return None
+        generated = generate(cells=cells, start=address,
+                             volatile=self.volatile)
+        if generated is None:
+            return None
+        end, instructions, constants, source = generated
+        namespace = {}
+        exec(compile(source, f'<intcode block {address}>', 'exec'), namespace)
+        block = Block(
+            start=address, end=end,
+            instructions=instructions, constants=constants,
+            values=tuple(cells[c] for c in constants),
+            function=namespace[f'block_{address}'], source=source)
+        self.shared[address] = block
+        self.adopt(block=block)
+        return block
+
+    def interpret(self) -> Generator[Optional[int], Optional[int], None]:
+        """Execute compiled blocks
+
+        Instructions which are not compiled, such as inputs, halts or code
+        left in sparse pages, are run by the reference implementation.
+
+        :return: program execution generator
+        """
+        self.sync_codemap()
+        blocks = self.blocks
+        inputs = self.inputs
+        cells = self.memory.cells
+        codemap = self.codemap
+        load = self.memory.load
+        store = self.store_code
+        invalidate = self.invalidate
+        pc = self.pc
+        rb = self.rb
+        outputs = []
+        while True:
+            block = blocks.get(pc)
+            if block is None:
+                block = self.compile_block(address=pc)
+            if block is not None:
+                pc, rb = block.function(rb, outputs, cells, codemap, load,
+                                        store, invalidate)
+                if outputs:
+                    self.pc, self.rb = pc, rb
+                    value = yield outputs.pop()
+                    pc, rb = self.pc, self.rb
+                    if value is not None:
+                        inputs.append(value)
+                continue
+            self.pc, self.rb = pc, rb
+            if (yield from self.walk()):
+                break
+            pc, rb = self.pc, self.rb
+        self.pc = pc
+        self.rb = rb
+        self.halted = True
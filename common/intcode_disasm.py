@@ -0,0 +1,492 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode disassembler and static optimizer
+
+Instructions reachable from address zero are decoded following the control
+flow, and grouped into basic blocks linked by their successors. Stores with
+a statically known destination are collected to find the memory cells the
+program may write, including its own instruction words.
+
+Relative-mode stores and jumps to computed addresses make any cell possibly
+written. Programs generated by a compiler usually keep their stack past the
+program image and only jump back to decoded instructions, which may be
+assumed on request.
+
+The optimizer rewrites instructions which are never written while they may
+still run: reads of constant cells become immediate operands, arithmetic on
+immediate operands is folded and multiplications by zero or one become
+additions. Instruction lengths are left unchanged. Rewritten words must not
+be loaded as operand values, which requires relative-mode loads to have a
+bounded relative base.
+
+The optimizer is a listing and analysis tool, no backend runs optimized
+images. The puzzle inputs are left unchanged: the day 9, 11 and 13 programs
+jump to computed addresses, and even once a stack is assumed the day 9
+program loads relative-mode operands with an unbounded relative base while
+the day 11 and 13 programs rewrite their own instructions.
+"""
+
+import argparse
+import logging
+import sys
+from typing import NamedTuple, Optional
+
+from common.intcode import (
+    ADD, EQ, HALT, ISA, JNZ, JZ, LT, MUL, RBS, INTCODE_INSTR_MOD,
+    Instruction, Mode, OpcodeError, decode)
+from common.intcode_image import load_programs
+
+log = logging.getLogger(__name__)
+
+EXIT_SUCCESS = 0
+MAX_BASE_VALUES = 64
+LOG_FORMAT = '# %(msecs)-3d - %(funcName)-16s - %(levelname)-8s - %(message)s'
+OPERATORS = {ADD: lambda a, b: a + b, MUL: lambda a, b: a * b,
+             LT: lambda a, b: int(a < b), EQ: lambda a, b: int(a == b)}
+
+
+class BasicBlock(NamedTuple):
+    """Straight-line run of instructions"""
+    start: int
+    end: int
+    successors: tuple[int, ...]
+
+
+class Analysis:
+    """Static analysis of an Intcode program
+
+    Attributes:
+        program -- analyzed program image
+        instructions -- decoded instruction per reachable address
+        blocks -- basic block per start address
+        writers -- addresses of the instructions storing at each address
+        unknown -- reasons making any address possibly written
+        self_modifying -- instructions storing into reachable instructions
+        jumps -- true if the program contains any jump
+    """
+
+    def __init__(self, program: list[int], assume_stack: bool = False):
+        """Analyze a program image
+
+        :param program: program image
+        :param assume_stack: assume relative-mode stores land past the image
+            and computed jumps land on decoded instructions
+        """
+        self.program = program
+        self.instructions: dict[int, Instruction] = {}
+        self.blocks: dict[int, BasicBlock] = {}
+        self.writers: dict[int, list[int]] = {}
+        self.unknown: list[str] = []
+        self.self_modifying: set[int] = set()
+        self.jumps = False
+        targets = self.explore(assume_stack=assume_stack)
+        self.collect_stores(assume_stack=assume_stack)
+        self.build_blocks(targets=targets)
+
+    def explore(self, assume_stack: bool) -> set[int]:
+        """Decode instructions reachable from address zero
+
+        :param assume_stack: accept jumps to computed addresses
+        :return: addresses of jump targets
+        """
+        program = self.program
+        targets = set()
+        pending = [0]
+        while pending:
+            pc = pending.pop()
+            while 0 <= pc < len(program) and pc not in self.instructions:
+                try:
+                    instr = decode(instruction=program[pc])
+                except (OpcodeError, ValueError):
+                    log.debug(f'Invalid instruction @{pc}')
+                    break
+                if pc + instr.length > len(program):
+                    break
+                self.instructions[pc] = instr
+                if instr.opcode == HALT:
+                    break
+                if instr.opcode in (JNZ, JZ):
+                    self.jumps = True
+                    if instr.modes[1] == Mode.IMMEDIATE:
+                        targets.add(program[pc + 2])
+                        pending.append(program[pc + 2])
+                    elif not assume_stack:
+                        self.unknown.append(f'computed jump @{pc}')
+                pc += instr.length
+        return targets
+
+    def collect_stores(self, assume_stack: bool) -> None:
+        """Collect statically known store destinations
+
+        :param assume_stack: ignore relative-mode stores
+        :return: nothing
+        """
+        program = self.program
+        for pc, (opcode, modes, length) in self.instructions.items():
+            if not ISA[opcode].store_args:
+                continue
+            mode = modes[length - 2]
+            if mode == Mode.RELATIVE:
+                if not assume_stack:
+                    self.unknown.append(f'relative store @{pc}')
+                continue
+            self.writers.setdefault(program[pc + length - 1], []).append(pc)
+        for pc, (opcode, modes, length) in self.instructions.items():
+            words = range(pc, pc + length)
+            hits = [w for a in words for w in self.writers.get(a, [])
+                    if self.may_precede(writer=w, reader=pc)]
+            self.self_modifying.update(hits)
+            if any(self.may_precede(writer=w, reader=pc)
+                   for w in self.writers.get(pc, [])):
+                self.unknown.append(f'rewritten opcode @{pc}')
+            elif hits and (ISA[opcode].store_args or ISA[opcode].jump):
+                self.unknown.append(f'rewritten operand @{pc}')
+
+    def build_blocks(self, targets: set[int]) -> None:
+        """Split decoded instructions into basic blocks
+
+        :param targets: addresses of jump targets
+        :return: nothing
+        """
+        leaders = {0} | (targets & self.instructions.keys())
+        for pc, instr in self.instructions.items():
+            if instr.opcode in (JNZ, JZ, HALT):
+                leaders.add(pc + instr.length)
+        start = None
+        for pc in sorted(self.instructions):
+            if start is None or pc in leaders:
+                start = pc
+            opcode, modes, length = self.instructions[pc]
+            next_pc = pc + length
+            if next_pc in leaders or next_pc not in self.instructions \
+                    or opcode in (JNZ, JZ, HALT):
+                successors = []
+                if opcode in (JNZ, JZ) and modes[1] == Mode.IMMEDIATE:
+                    successors.append(self.program[pc + 2])
+                if opcode != HALT and next_pc in self.instructions:
+                    successors.append(next_pc)
+                self.blocks[start] = BasicBlock(
+                    start=start, end=next_pc, successors=tuple(successors))
+                start = None
+
+    def may_precede(self, writer: int, reader: int) -> bool:
+        """Check if an instruction may run before another one runs
+
+        Without jumps, instructions run once in address order.
+
+        :param writer: address of the first instruction
+        :param reader: address of the second instruction
+        :return: true unless the program proves otherwise
+        """
+        return self.jumps or writer < reader
+
+    def constant(self, address: int, reader: int) -> bool:
+        """Check if a cell holds its initial value whenever an instruction runs
+
+        :param address: cell address
+        :param reader: address of the reading instruction
+        :return: true if proven
+        """
+        if self.unknown or not 0 <= address < len(self.program):
+            return False
+        return not any(self.may_precede(writer=w, reader=reader)
+                       for w in self.writers.get(address, []))
+
+    def stable(self, pc: int) -> bool:
+        """Check if an instruction is never rewritten before it runs
+
+        :param pc: instruction address
+        :return: true if proven
+        """
+        length = self.instructions[pc].length
+        return all(self.constant(address=a, reader=pc)
+                   for a in range(pc, pc + length))
+
+
+# Listing Methods --------------------------------------------------------------
+
+
+def format_operand(mode: int, word: int) -> str:
+    """Format an operand in assembly syntax
+
+    :param mode: operand access mode
+    :param word: operand word
+    :return: operand text
+    """
+    if mode == Mode.IMMEDIATE:
+        return f'{word}'
+    if mode == Mode.RELATIVE:
+        return f'[rb{word:+d}]'
+    return f'[{word}]'
+
+
+def listing(analysis: Analysis) -> str:
+    """Format an annotated listing of the analyzed program
+
+    Words which are not part of a decoded instruction are listed as data.
+
+    :param analysis: program analysis
+    :return: multi-line listing
+    """
+    program = analysis.program
+    lines = [f'; {len(analysis.instructions)} instructions, '
+             f'{len(analysis.blocks)} basic blocks']
+    for reason in analysis.unknown:
+        lines.append(f'; unknown writes: {reason}')
+    pc = 0
+    while pc < len(program):
+        instr = analysis.instructions.get(pc)
+        if instr is None:
+            notes = ' ; written' if pc in analysis.writers else ''
+            lines.append(f'{pc:>6}: {program[pc]:<24} .data{notes}')
+            pc += 1
+            continue
+        opcode, modes, length = instr
+        block = analysis.blocks.get(pc)
+        if block is not None:
+            successors = ', '.join(map(str, block.successors)) or '-'
+            lines.append(f'; block {block.start}-{block.end - 1} '
+                         f'-> {successors}')
+        words = ','.join(map(str, program[pc:pc + length]))
+        operands = ', '.join(
+            format_operand(mode=m, word=w)
+            for m, w in zip(modes, program[pc + 1:pc + length]))
+        notes = []
+        if pc in analysis.self_modifying:
+            notes.append('self-modifying')
+        if any(a in analysis.writers for a in range(pc, pc + length)):
+            notes.append('rewritten')
+        notes = f' ; {", ".join(notes)}' if notes else ''
+        lines.append(f'{pc:>6}: {words:<24} {ISA[opcode].name:<5} '
+                     f'{operands}{notes}')
+        pc += length
+    return '\n'.join(lines)
+
+
+# Optimization Methods ---------------------------------------------------------
+
+
+def encode(opcode: int, modes: list[int]) -> int:
+    """Encode an instruction word
+
+    :param opcode: instruction opcode
+    :param modes: operand access modes
+    :return: instruction word
+    """
+    word = opcode
+    for i, mode in enumerate(modes):
+        word += INTCODE_INSTR_MOD * 10 ** i * mode
+    return word
+
+
+def base_values(analysis: Analysis) -> Optional[dict[int, set[int]]]:
+    """Bound the relative base whenever each instruction runs
+
+    Relative base values are propagated along the control flow from address
+    zero, where the base is zero.
+
+    :param analysis: program analysis
+    :return: possible relative base values per instruction address, or None
+        if a base adjustment is computed, a jump target is unknown or too many
+        values are possible
+    """
+    program = analysis.program
+    instructions = analysis.instructions
+    values = {0: {0}}
+    pending = [0]
+    while pending:
+        pc = pending.pop()
+        opcode, modes, length = instructions[pc]
+        bases = values[pc]
+        if opcode == RBS:
+            if modes[0] != Mode.IMMEDIATE:
+                return None
+            bases = {rb + program[pc + 1] for rb in bases}
+        successors = []
+        if opcode in (JNZ, JZ):
+            if modes[1] != Mode.IMMEDIATE:
+                return None
+            successors.append(program[pc + 2])
+        if opcode != HALT:
+            successors.append(pc + length)
+        for successor in successors:
+            if successor not in instructions:
+                continue
+            known = values.setdefault(successor, set())
+            if not bases <= known:
+                known.update(bases)
+                if len(known) > MAX_BASE_VALUES:
+                    return None
+                pending.append(successor)
+    return values
+
+
+def data_reads(analysis: Analysis, folded: dict[int, set[int]]
+               ) -> Optional[set[int]]:
+    """Collect the addresses which may be loaded as operand values
+
+    :param analysis: program analysis
+    :param folded: indexes of the operands folded into immediate values per
+        instruction address
+    :return: addresses possibly loaded, or None if unbounded
+    """
+    program = analysis.program
+    reads = set()
+    bases = None
+    for pc, (opcode, modes, length) in analysis.instructions.items():
+        for i in range(ISA[opcode].load_args):
+            if modes[i] == Mode.IMMEDIATE or i in folded.get(pc, ()):
+                continue
+            if not analysis.constant(address=pc + 1 + i, reader=pc):
+                return None
+            word = program[pc + 1 + i]
+            if modes[i] == Mode.POSITION:
+                reads.add(word)
+                continue
+            if bases is None:
+                bases = base_values(analysis=analysis)
+                if bases is None:
+                    return None
+            reads.update(rb + word for rb in bases.get(pc, ()))
+    return reads
+
+
+def rewrite(analysis: Analysis, pc: int) -> tuple[list[int], set[int]]:
+    """Rewrite a stable instruction
+
+    :param analysis: program analysis
+    :param pc: instruction address
+    :return: instruction words, and indexes of the operands folded into
+        immediate values
+    """
+    program = analysis.program
+    opcode, modes, length = analysis.instructions[pc]
+    modes = list(modes)
+    words = program[pc + 1:pc + length]
+    folded = set()
+    for i in range(ISA[opcode].load_args):
+        if modes[i] == Mode.POSITION \
+                and analysis.constant(address=words[i], reader=pc):
+            modes[i] = Mode.IMMEDIATE
+            words[i] = program[words[i]]
+            folded.add(i)
+    if opcode in OPERATORS and modes[0] == modes[1] == Mode.IMMEDIATE:
+        words[:2] = [OPERATORS[opcode](words[0], words[1]), 0]
+        opcode = ADD
+    elif opcode == MUL:
+        for i in (0, 1):
+            if modes[i] == Mode.IMMEDIATE and words[i] in (0, 1):
+                other = 1 - i
+                if words[i] == 0:
+                    words[:2] = [0, 0]
+                    modes[other] = Mode.IMMEDIATE
+                else:
+                    words[i], words[other] = words[other], 0
+                    modes[i], modes[other] = modes[other], Mode.IMMEDIATE
+                opcode = ADD
+                break
+    return [encode(opcode=opcode, modes=modes[:length - 1])] + words, folded
+
+
+def optimize(analysis: Analysis) -> list[int]:
+    """Rewrite stable instructions of an analyzed program, for listings
+
+    Instruction words which may also be loaded as operand values are left
+    unchanged, and so are the instructions folding their operands, until no
+    rewritten word may be loaded.
+
+    :param analysis: program analysis
+    :return: optimized program image
+    """
+    program = analysis.program
+    image = list(program)
+    if analysis.unknown:
+        log.warning(f'Program not optimized: {analysis.unknown[0]}')
+        return image
+    rewrites = {pc: rewrite(analysis=analysis, pc=pc)
+                for pc in analysis.instructions if analysis.stable(pc=pc)}
+    while True:
+        reads = data_reads(analysis=analysis, folded={
+            pc: folded for pc, (_, folded) in rewrites.items()})
+        if reads is None:
+            log.warning('Program not optimized: unbounded data reads')
+            return image
+        loaded = [pc for pc, (words, _) in rewrites.items()
+                  if any(pc + i in reads and word != program[pc + i]
+                         for i, word in enumerate(words))]
+        if not loaded:
+            break
+        log.debug(f'Instructions loaded as data: {loaded}')
+        for pc in loaded:
+            del rewrites[pc]
+    for pc, (words, _) in rewrites.items():
+        image[pc:pc + len(words)] = words
+    folded = sum(len(folded) for _, folded in rewrites.values())
+    log.info(f'{folded} operands folded')
+    return image
+
+
+# Support Methods --------------------------------------------------------------
+
+
+def configure_logger(verbose: bool):
+    """Configure logging
+
+    :param verbose: display debug and info messages
+    :return: nothing
+    """
+    logger = logging.getLogger()
+    logger.handlers = []
+    stderr = logging.StreamHandler(sys.stderr)
+    stderr.setLevel(level=logging.WARNING)
+    stderr.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(stderr)
+    if verbose:
+        stderr.setLevel(level=logging.DEBUG)
+        logger.setLevel(level=logging.DEBUG)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse arguments provided by the command-line
+
+    :return: list of decoded arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    pa = parser.add_argument
+    pa('filename', type=str, help='input contents filename')
+    pa('-i', '--index', type=int, default=0,
+       help='program line in multi-program files')
+    pa('-O', '--optimize', action='store_true',
+       help='list the optimized program')
+    pa('-s', '--assume-stack', action='store_true',
+       help='assume relative stores and computed jumps stay off the code')
+    pa('-o', '--output', type=str,
+       help='write the listed program image to the given file')
+    pa('-v', '--verbose', action='store_true', help='print extra messages')
+    arguments = parser.parse_args()
+    return arguments
+
+
+def main() -> int:
+    """Script main method
+
+    :return: script exit code returned to the shell
+    """
+    args = parse_arguments()
+    configure_logger(verbose=args.verbose)
+    program = load_programs(filename=args.filename)[args.index]
+    analysis = Analysis(program=program, assume_stack=args.assume_stack)
+    if args.optimize:
+        analysis = Analysis(program=optimize(analysis=analysis),
+                            assume_stack=args.assume_stack)
+    print(listing(analysis=analysis))
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(','.join(map(str, analysis.program)) + '\n')
+    return EXIT_SUCCESS
+
+
+if __name__ == "__main__":
+    sys.exit(main())
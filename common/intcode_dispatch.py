@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode dispatch table
+
+A handler is generated for every instruction word of the arithmetic,
+comparison and jump opcodes when the module is imported, specialized for the
+access modes of its operands. The interpreter looks the handler up by the raw
+instruction word, so that no decoding, mode test or opcode test happens for
+these instructions. Input, output, relative base and halt words are decoded
+at import as well and handled by the interpreter loop.
+
+Instruction words are read again on each execution, so that programs storing
+into their own code need no cache invalidation.
+"""
+
+import itertools
+import logging
+from typing import Callable, Generator, Optional
+
+from common.intcode import (
+    ADD, EQ, HALT, IN, INTCODE_INSTR_MOD, ISA, JNZ, JZ, LT, MAX_ARGS,
+    MAX_GROWTH, MUL, RBS, AddressError, Computer, Mode, decode)
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[list[int], int, int], int]
+
+HANDLER_TEMPLATES = {
+    ADD: ['cells[c] = a + b', 'return pc + 4'],
+    MUL: ['cells[c] = a * b', 'return pc + 4'],
+    LT: ['cells[c] = 1 if a < b else 0', 'return pc + 4'],
+    EQ: ['cells[c] = 1 if a == b else 0', 'return pc + 4'],
+    JNZ: ['return b if a != 0 else pc + 3'],
+    JZ: ['return b if a == 0 else pc + 3'],
+}
+
+
+# Table Generation Methods -----------------------------------------------------
+
+
+def operand_address(name: str, mode: int, offset: int) -> list[str]:
+    """Get the statements setting a local variable to an operand address
+
+    A negative address raises an `IndexError`, as an address past the
+    contiguous cells does.
+
+    :param name: local variable name
+    :param mode: operand access mode, immediate operands designate themselves
+    :param offset: operand word offset from the instruction word
+    :return: Python statements
+    """
+    if mode == Mode.IMMEDIATE:
+        return [f'{name} = pc + {offset}']
+    word = f'cells[pc + {offset}]'
+    address = f'{word} + rb' if mode == Mode.RELATIVE else word
+    return [f'{name} = {address}',
+            f'if {name} < 0:',
+            f'    raise IndexError({name})']
+
+
+def handler_source(name: str, opcode: int, modes: tuple[int, ...]) -> str:
+    """Generate the source of an instruction handler
+
+    Destinations in immediate mode are written as in position mode, like the
+    interpreter does.
+
+    :param name: function name
+    :param opcode: instruction opcode
+    :param modes: access modes of the three operands
+    :return: Python function source taking cells, pc and rb, and returning
+        the address of the next instruction
+    """
+    lines = []
+    for i, (operand, mode) in enumerate(zip('ab', modes)):
+        if mode == Mode.IMMEDIATE:
+            lines.append(f'{operand} = cells[pc + {i + 1}]')
+        else:
+            lines.extend(operand_address(name=operand, mode=mode,
+                                         offset=i + 1))
+            lines.append(f'{operand} = cells[{operand}]')
+    if ISA[opcode].store_args:
+        store_mode = (Mode.RELATIVE if modes[2] == Mode.RELATIVE
+                      else Mode.POSITION)
+        lines.extend(operand_address(name='c', mode=store_mode, offset=3))
+    lines.extend(HANDLER_TEMPLATES[opcode])
+    body = ''.join(f'    {line}\n' for line in lines)
+    return f'def {name}(cells, pc, rb):\n{body}'
+
+
+def build_tables() -> tuple[dict[int, Handler], dict[int, tuple[int, int]]]:
+    """Generate the handler and control tables for all instruction words
+
+    Identical handlers, such as jumps differing by the unused third mode, are
+    shared between instruction words.
+
+    :return: handler per arithmetic, comparison or jump word, and opcode with
+        first operand mode per input, output, relative base or halt word
+    """
+    handlers = {}
+    controls = {}
+    functions = {}
+    for opcode, modes in itertools.product(ISA, itertools.product(
+            Mode, repeat=MAX_ARGS)):
+        word = opcode + INTCODE_INSTR_MOD * sum(
+            mode * 10 ** i for i, mode in enumerate(modes))
+        if opcode not in HANDLER_TEMPLATES:
+            controls[word] = (opcode, decode(instruction=word).modes[0])
+            continue
+        source = handler_source(name='handler', opcode=opcode, modes=modes)
+        if source not in functions:
+            namespace = {}
+            exec(compile(source, f'<intcode handler {word}>', 'exec'),
+                 namespace)
+            functions[source] = namespace['handler']
+        handlers[word] = functions[source]
+    log.debug(f'{len(functions)} handlers for {len(handlers)} words')
+    return handlers, controls
+
+
+HANDLERS, CONTROLS = build_tables()
+
+
+# Computer ---------------------------------------------------------------------
+
+
+class DispatchComputer(Computer):
+    """Intcode computer dispatching instructions through the handler table
+
+    A handler accessing memory past the contiguous cells or at a negative
+    address raises an `IndexError` before storing anything, and the
+    instruction is then run again by the reference implementation. Words
+    missing from the tables, such as words with extra high digits, and
+    instructions left in sparse pages are run by the reference
+    implementation as well.
+    """
+
+    def interpret(self) -> Generator[Optional[int], Optional[int], None]:
+        """Interpret the program instructions through the dispatch table
+
+        :return: program execution generator
+        """
+        memory = self.memory
+        cells = memory.cells
+        inputs = self.inputs
+        handlers = HANDLERS
+        controls = CONTROLS
+        pc = self.pc
+        rb = self.rb
+        immediate = Mode.IMMEDIATE
+        relative = Mode.RELATIVE
+
+        while True:
+            try:
+                word = cells[pc]
+            except IndexError:
+                if pc < len(cells) + MAX_GROWTH:
+                    memory.grow(size=pc + 1 + MAX_ARGS)
+                    continue
+                self.pc, self.rb = pc, rb
+                if (yield from self.walk()):
+                    break
+                pc, rb = self.pc, self.rb
+                continue
+            handler = handlers.get(word)
+            if handler is not None:
+                try:
+                    pc = handler(cells, pc, rb)
+                except IndexError:
+                    self.pc, self.rb = pc, rb
+                    self.decoded.pop(pc, None)
+                    self.step()
+                    pc = self.pc
+                continue
+            control = controls.get(word)
+            if control is None:
+                opcode, modes, _ = decode(instruction=word)
+                if opcode in HANDLER_TEMPLATES:
+                    self.pc, self.rb = pc, rb
+                    self.decoded.pop(pc, None)
+                    self.step()
+                    pc = self.pc
+                    continue
+                control = opcode, modes[0]
+            opcode, mode = control
+            if opcode == HALT:
+                break
+            address = cells[pc + 1]
+            if mode == relative:
+                address += rb
+            if address < 0 and mode != immediate:
+                raise AddressError(address=address)
+            if opcode == IN:
+                if not inputs:
+                    self.pc, self.rb = pc, rb
+                    value = yield None
+                    pc, rb = self.pc, self.rb
+                    if value is not None:
+                        inputs.append(value)
+                    continue
+                self.store(address=address, value=inputs.popleft())
+                pc += 2
+                continue
+            value = address
+            if mode != immediate:
+                try:
+                    value = cells[address]
+                except IndexError:
+                    value = memory.load(address=address)
+            pc += 2
+            if opcode == RBS:
+                rb += value
+                continue
+            self.pc, self.rb = pc, rb
+            value = yield value
+            pc, rb = self.pc, self.rb
+            if value is not None:
+                inputs.append(value)
+        self.pc = pc
+        self.rb = rb
+        self.halted = True
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode program image cache
+
+Comma-separated programs are parsed once and stored next to the input file as
+a binary image of native 64-bit integers. Later loads map the image into
+memory instead of parsing the text. The image is trusted as long as the size
+and modification time of the input file are unchanged, the input contents
+being hashed only otherwise, so that touching the input does not require a
+new image.
+
+The image holds the size, modification time and hash of the input file, the
+number of programs, the length of each program and then the program values.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+from array import array
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+log = logging.getLogger(__name__)
+
+IMAGE_SUFFIX = '.intcode'
+DIGEST_SIZE = 8
+HEADER_SIZE = 3
+
+
+class Source(NamedTuple):
+    """Input file metadata stored in the image header"""
+    size: int
+    mtime: int
+    digest: int
+
+
+def parse(text: str) -> list[list[int]]:
+    """Parse comma-separated programs, one per line
+
+    :param text: input contents
+    :return: list of programs
+    """
+    return [[int(token) for token in line.split(',')]
+            for line in text.strip().splitlines() if line.strip()]
+
+
+def image_path(filename: str) -> Path:
+    """Get the image path for the given input file
+
+    :param filename: input filename
+    :return: image path located next to the input file
+    """
+    path = Path(filename)
+    return path.with_name(f'{path.name}{IMAGE_SUFFIX}')
+
+
+def digest(contents: bytes) -> int:
+    """Hash input contents
+
+    :param contents: input file contents
+    :return: signed 64-bit hash
+    """
+    value = hashlib.blake2b(contents, digest_size=DIGEST_SIZE).digest()
+    return int.from_bytes(value, byteorder='little', signed=True)
+
+
+def read_source(path: Path) -> Optional[Source]:
+    """Read the input file metadata from an image header
+
+    :param path: image path
+    :return: input file metadata, nothing if the image is missing or invalid
+    """
+    header = array('q')
+    try:
+        with open(path, 'rb') as file:
+            contents = file.read(HEADER_SIZE * header.itemsize)
+    except OSError:
+        return None
+    if len(contents) < HEADER_SIZE * header.itemsize:
+        return None
+    header.frombytes(contents)
+    return Source(*header)
+
+
+def write_image(path: Path, source: Source,
+                programs: list[list[int]]) -> None:
+    """Write programs as a binary image
+
+    :param path: image path
+    :param source: input file metadata
+    :param programs: list of programs
+    :return: nothing
+    """
+    image = array('q', source)
+    image.append(len(programs))
+    image.extend(len(program) for program in programs)
+    for program in programs:
+        image.extend(program)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}')
+    with open(temporary, 'wb') as file:
+        image.tofile(file)
+    os.replace(temporary, path)
+
+
+def read_image(path: Path) -> list[list[int]]:
+    """Read programs from a memory-mapped binary image
+
+    :param path: image path
+    :return: list of programs
+    """
+    with open(path, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        view = memoryview(mapping).cast('q')
+        try:
+            count = view[HEADER_SIZE]
+            offset = HEADER_SIZE + 1
+            lengths = view[offset:offset + count].tolist()
+            programs = []
+            offset += count
+            for length in lengths:
+                programs.append(view[offset:offset + length].tolist())
+                offset += length
+        finally:
+            view.release()
+    return programs
+
+
+def load_programs(filename: str) -> list[list[int]]:
+    """Load programs from an input file, through its cached image if any
+
+    The image is created on first load, and replaced when the input contents
+    change. When only the modification time changes, the image is rewritten
+    with the new one. Inputs with values outside of the 64-bit range, or
+    located in read-only directories, are parsed each time.
+
+    :param filename: input filename
+    :return: list of programs
+    """
+    path = image_path(filename=filename)
+    status = os.stat(filename)
+    cached = read_source(path=path)
+    if cached is not None and (cached.size, cached.mtime) == (
+            status.st_size, status.st_mtime_ns):
+        programs = read_image(path=path)
+        log.debug(f'Mapped {len(programs)} programs from {path}')
+        return programs
+    contents = Path(filename).read_bytes()
+    source = Source(size=len(contents), mtime=status.st_mtime_ns,
+                    digest=digest(contents=contents))
+    if cached is not None and (cached.size, cached.digest) == (
+            source.size, source.digest):
+        programs = read_image(path=path)
+        log.debug(f'Input unchanged, mapped {len(programs)} programs from '
+                  f'{path}')
+    else:
+        programs = parse(text=contents.decode())
+    try:
+        write_image(path=path, source=source, programs=programs)
+        log.debug(f'Cached {len(programs)} programs into {path}')
+    except (OverflowError, OSError) as error:
+        log.debug(f'Cannot cache {filename}: {error}')
+    return programs
@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode subroutine memoization
+
+Compiled Intcode programs call subroutines by storing the return address at
+`[rb+0]` and jumping to an entry point which shifts the relative base by the
+frame size. The routine returns by shifting it back and jumping through
+`[rb+0]`.
+
+Routines performing no input or output and no other computed jump are
+deterministic, as long as the relative base only moves at calls and returns
+and the routine never overwrites its return address. Every cell they read is
+then known statically, either relative to the frame or by a position-mode
+address inside the program image, and their effects only depend on the
+cells they may read before writing them. The first call with given input
+values records the final value of every cell written until it returns;
+later calls with the same values replay the recorded stores and return at
+once.
+
+Analysis relies on the stack assumptions of `Analysis` with `assume_stack`,
+that is a stack past the program image, which position-mode accesses inside
+the image cannot reach. Calls and returns are detected by hooks on the
+entry points and on the return addresses, and stores are recorded by a
+watchpoint on every address.
+"""
+
+import logging
+from typing import Iterable, NamedTuple, Optional
+
+from common.intcode import (
+    ADD, HALT, IN, ISA, JNZ, JZ, MUL, OUT, RBS, Computer, Mode)
+from common.intcode_disasm import OPERATORS, Analysis
+
+log = logging.getLogger(__name__)
+
+MAX_INPUTS = 64
+
+Cells = set[tuple[int, int]]
+
+
+class Routine(NamedTuple):
+    """Memoizable subroutine
+
+    Input cells are given relative to the relative base of the caller, and
+    as absolute addresses for position-mode cells.
+    """
+    entry: int
+    size: int
+    offsets: tuple[int, ...]
+    addresses: tuple[int, ...]
+
+
+class Call(NamedTuple):
+    """Subroutine call being recorded"""
+    key: tuple[int, ...]
+    rb: int
+    ret: int
+    frame: dict[int, int]
+    fixed: dict[int, int]
+
+
+# Analysis Methods -------------------------------------------------------------
+
+
+def find_entries(analysis: Analysis) -> dict[int, int]:
+    """Find subroutine entry points and their frame sizes
+
+    :param analysis: program analysis
+    :return: frame size per entry address
+    """
+    program = analysis.program
+    instructions = analysis.instructions
+    entries = {}
+    for pc in instructions:
+        if not is_call(analysis=analysis, pc=pc):
+            continue
+        target = program[pc + 2]
+        prologue = instructions.get(target)
+        if prologue is None or prologue.opcode != RBS \
+                or prologue.modes[0] != Mode.IMMEDIATE \
+                or program[target + 1] <= 0:
+            continue
+        entries[target] = program[target + 1]
+    return entries
+
+
+def is_call(analysis: Analysis, pc: int) -> bool:
+    """Check if an instruction is a subroutine call
+
+    A call is an unconditional jump right after storing the address following
+    the jump at `[rb+0]`.
+
+    :param analysis: program analysis
+    :param pc: instruction address
+    :return: true for calls
+    """
+    program = analysis.program
+    if not is_goto(analysis=analysis, pc=pc):
+        return False
+    store = analysis.instructions.get(pc - 4)
+    return store is not None and store.opcode in (ADD, MUL) \
+        and store.modes[:3] == (Mode.IMMEDIATE, Mode.IMMEDIATE,
+                                Mode.RELATIVE) \
+        and program[pc - 1] == 0 \
+        and OPERATORS[store.opcode](*program[pc - 3:pc - 1]) == pc + 3
+
+
+def is_goto(analysis: Analysis, pc: int) -> bool:
+    """Check if an instruction always jumps to an immediate address
+
+    :param analysis: program analysis
+    :param pc: instruction address
+    :return: true for unconditional immediate jumps
+    """
+    opcode, modes, _ = analysis.instructions[pc]
+    if opcode not in (JNZ, JZ) or modes[:2] != (Mode.IMMEDIATE,) * 2:
+        return False
+    return is_taken(opcode=opcode, condition=analysis.program[pc + 1])
+
+
+def is_taken(opcode: int, condition: int) -> bool:
+    """Check if a jump is taken for the given condition value
+
+    :param opcode: jump opcode
+    :param condition: condition value
+    :return: true if the jump is taken
+    """
+    return (condition != 0) == (opcode == JNZ)
+
+
+def scan_body(analysis: Analysis, entry: int, size: int,
+              entries: dict[int, int]) -> Optional[dict[int, tuple]]:
+    """Collect the instructions of a subroutine
+
+    Jumps to an entry point must be calls, the relative base may only be
+    shifted back by the epilogue, and position-mode cells must lie inside the
+    program image.
+
+    :param analysis: program analysis
+    :param entry: entry address
+    :param size: frame size
+    :param entries: frame size per entry address
+    :return: reads, writes, successors and callee per instruction address,
+        none if the routine cannot be memoized
+    """
+    program = analysis.program
+    instructions = analysis.instructions
+    body = {}
+    pending = [entry + 2]
+    while pending:
+        pc = pending.pop()
+        if pc in body:
+            continue
+        instr = instructions.get(pc)
+        if instr is None or not analysis.stable(pc=pc):
+            return None
+        opcode, modes, length = instr
+        if opcode in (IN, OUT, HALT):
+            return None
+        if opcode == RBS:
+            ret = instructions.get(pc + 2)
+            if modes[0] != Mode.IMMEDIATE or program[pc + 1] != -size \
+                    or ret is None or ret.opcode not in (JNZ, JZ) \
+                    or ret.modes[:2] != (Mode.IMMEDIATE, Mode.RELATIVE) \
+                    or program[pc + 4] != 0 \
+                    or not is_taken(opcode=ret.opcode,
+                                    condition=program[pc + 3]):
+                return None
+            body[pc] = (set(), set(), (), None)
+            continue
+        operands = list(zip(modes, program[pc + 1:pc + length]))
+        if any(m == Mode.POSITION and not 0 <= w < len(program)
+               for m, w in operands):
+            return None
+        loads = ISA[opcode].load_args
+        reads = {(m, w) for m, w in operands[:loads] if m != Mode.IMMEDIATE}
+        writes = set(operands[loads:])
+        callee = None
+        if opcode in (JNZ, JZ):
+            if modes[1] != Mode.IMMEDIATE:
+                return None
+            target = program[pc + 2]
+            if target in entries:
+                if not is_call(analysis=analysis, pc=pc):
+                    return None
+                callee = target
+                successors = (pc + length,)
+            elif is_goto(analysis=analysis, pc=pc):
+                successors = (target,)
+            else:
+                successors = (target, pc + length)
+        else:
+            successors = (pc + length,)
+        body[pc] = (reads, writes, successors, callee)
+        pending.extend(successors)
+    return body
+
+
+def find_routines(analysis: Analysis) -> dict[int, Routine]:
+    """Find memoizable subroutines and their input cells
+
+    Routines which may overwrite their return address, which have too many
+    input cells, or calling routines which cannot be memoized, are left out.
+
+    :param analysis: program analysis with stack assumptions
+    :return: routines indexed by entry address
+    """
+    if analysis.unknown:
+        log.warning(f'No memoization: {analysis.unknown[0]}')
+        return {}
+    entries = find_entries(analysis=analysis)
+    bodies = {}
+    for entry, size in entries.items():
+        body = scan_body(analysis=analysis, entry=entry, size=size,
+                         entries=entries)
+        if body is not None:
+            bodies[entry] = body
+    live = {}
+    below = {}
+    changed = True
+    while changed:
+        changed = False
+        for entry, body in list(bodies.items()):
+            if any(callee is not None and callee not in bodies
+                   for _, _, _, callee in body.values()):
+                del bodies[entry]
+                changed = True
+                continue
+            inputs = live_inputs(body=body, start=entry + 2, live=live,
+                                 entries=entries)
+            writes = frame_writes(body=body, below=below, entries=entries)
+            if len(inputs) > MAX_INPUTS \
+                    or (Mode.RELATIVE, -entries[entry]) in writes:
+                log.debug(f'Routine @{entry} cannot be memoized')
+                del bodies[entry]
+                changed = True
+                continue
+            if inputs != live.get(entry) or writes != below.get(entry):
+                live[entry] = inputs
+                below[entry] = writes
+                changed = True
+    routines = {}
+    for entry in bodies:
+        size = entries[entry]
+        routines[entry] = Routine(
+            entry=entry, size=size,
+            offsets=tuple(sorted(w + size for m, w in live[entry]
+                                 if m == Mode.RELATIVE)),
+            addresses=tuple(sorted(w for m, w in live[entry]
+                                   if m == Mode.POSITION)))
+        log.debug(f'Routine @{entry}: {routines[entry]}')
+    return routines
+
+
+def callee_cells(cells: Cells, size: int) -> Cells:
+    """Express the cells of a callee relative to the frame of its caller
+
+    :param cells: cells relative to the frame of the callee
+    :param size: frame size of the callee
+    :return: cells relative to the frame of the caller
+    """
+    return {(m, w + size) if m == Mode.RELATIVE else (m, w) for m, w in cells}
+
+
+def live_inputs(body: dict[int, tuple], start: int,
+                live: dict[int, Cells], entries: dict[int, int]) -> Cells:
+    """Find the cells a routine may read before writing them
+
+    Calls read the inputs of their callee, and are not assumed to write
+    anything.
+
+    :param body: instructions of the routine
+    :param start: address of the first instruction after the prologue
+    :param live: input cells per routine, relative to their own frame
+    :param entries: frame size per entry address
+    :return: input cells, relative to the frame of the routine
+    """
+    live_in = {pc: set() for pc in body}
+    changed = True
+    while changed:
+        changed = False
+        for pc, (reads, writes, successors, callee) in body.items():
+            cells = set(reads)
+            if callee is not None:
+                cells |= callee_cells(cells=live.get(callee, set()),
+                                      size=entries[callee])
+            for successor in successors:
+                cells |= live_in[successor] - writes
+            if cells != live_in[pc]:
+                live_in[pc] = cells
+                changed = True
+    return live_in[start]
+
+
+def frame_writes(body: dict[int, tuple], below: dict[int, Cells],
+                 entries: dict[int, int]) -> Cells:
+    """Find the cells a routine may write below its stack top
+
+    Cells past the top of the stack are left out, so that the cells written
+    by deeper recursive calls do not pile up.
+
+    :param body: instructions of the routine
+    :param below: cells written below the stack top per routine
+    :param entries: frame size per entry address
+    :return: relative-mode cells with a negative offset from the frame of the
+        routine
+    """
+    cells = set()
+    for _, writes, _, callee in body.values():
+        cells |= writes
+        if callee is not None:
+            cells |= callee_cells(cells=below.get(callee, set()),
+                                  size=entries[callee])
+    return {(m, w) for m, w in cells if m == Mode.RELATIVE and w < 0}
+
+
+# Memoized Computer ------------------------------------------------------------
+
+
+class MemoizedComputer(Computer):
+    """Intcode computer replaying the effects of memoized subroutine calls
+
+    Stores landing inside the program image during a call are recorded by
+    address, the others relative to the relative base of the caller.
+    Computers resumed from a snapshot run without memoization, since neither
+    the program image nor the calls in flight are known.
+
+    Attributes:
+        routines -- memoizable routines indexed by entry address
+        cache -- frame and position-mode stores per routine and input values
+        calls -- calls being recorded, innermost last
+        returns -- hooked return addresses
+        image_size -- number of cells of the program image
+        hits -- number of calls replayed from the cache
+        misses -- number of calls recorded
+    """
+
+    def __init__(self, program: Iterable[int], inputs: Iterable[int] = (),
+                 routines: Optional[dict[int, Routine]] = None):
+        program = list(program)
+        super().__init__(program=program, inputs=inputs)
+        if routines is None:
+            routines = find_routines(
+                analysis=Analysis(program=program, assume_stack=True))
+        self.routines = routines
+        self.cache: dict[tuple[int, ...],
+                         tuple[dict[int, int], dict[int, int]]] = {}
+        self.calls: list[Call] = []
+        self.returns: set[int] = set()
+        self.image_size = len(program)
+        self.hits = 0
+        self.misses = 0
+        for entry in routines:
+            self.hook(address=entry, callback=self.enter)
+        if routines:
+            self.watch(address=None, callback=self.collect)
+
+    def enter(self, _: Computer) -> None:
+        """Replay a routine call from the cache, or start recording it
+
+        :return: nothing
+        """
+        routine = self.routines[self.pc]
+        load = self.load
+        rb = self.rb
+        key = (routine.entry, *(load(address=rb + o) for o in routine.offsets),
+               *(load(address=a) for a in routine.addresses))
+        ret = load(address=rb)
+        effects = self.cache.get(key)
+        if effects is not None:
+            self.hits += 1
+            self.replay(rb, *effects)
+            self.merge(rb, *effects)
+            self.pc = ret
+            return
+        self.misses += 1
+        self.calls.append(Call(key=key, rb=rb, ret=ret, frame={}, fixed={}))
+        if ret not in self.returns:
+            self.returns.add(ret)
+            self.hook(address=ret, callback=self.leave)
+
+    def leave(self, _: Computer) -> None:
+        """Cache the effects of the innermost call if it returns
+
+        :return: nothing
+        """
+        calls = self.calls
+        if not calls or calls[-1].ret != self.pc or calls[-1].rb != self.rb:
+            return
+        call = calls.pop()
+        self.cache[call.key] = call.frame, call.fixed
+        self.merge(call.rb, call.frame, call.fixed)
+
+    def collect(self, _: Computer, address: int, value: int) -> None:
+        """Record a store into the innermost call
+
+        :param address: memory address
+        :param value: stored value
+        :return: nothing
+        """
+        if not self.calls:
+            return
+        call = self.calls[-1]
+        if address < self.image_size:
+            call.fixed[address] = value
+        else:
+            call.frame[address - call.rb] = value
+
+    def merge(self, rb: int, frame: dict[int, int],
+              fixed: dict[int, int]) -> None:
+        """Add the effects of a nested call to the innermost call
+
+        :param rb: relative base of the caller of the nested call
+        :param frame: values per offset from the relative base
+        :param fixed: values per position-mode address
+        :return: nothing
+        """
+        if not self.calls:
+            return
+        outer = self.calls[-1]
+        shift = rb - outer.rb
+        for offset, value in frame.items():
+            outer.frame[offset + shift] = value
+        outer.fixed.update(fixed)
+
+    def replay(self, rb: int, frame: dict[int, int],
+               fixed: dict[int, int]) -> None:
+        """Apply the stores recorded for a call
+
+        :param rb: relative base of the caller
+        :param frame: values per offset from the relative base
+        :param fixed: values per position-mode address
+        :return: nothing
+        """
+        for offset, value in frame.items():
+            self.store(address=rb + offset, value=value)
+        for address, value in fixed.items():
+            self.store(address=address, value=value)
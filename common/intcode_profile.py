@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode execution profiler
+
+Instructions are executed one at a time through `Computer.step`, counting
+opcodes per access modes and executed instruction addresses. Each execution
+slice, from a resume of the program until its next output or input request,
+is timed separately.
+"""
+
+import logging
+import time
+from collections import Counter
+from typing import Generator, Iterable, Optional
+
+from common.intcode import HALT, IN, ISA, OUT, Computer
+
+log = logging.getLogger(__name__)
+
+HOT_ADDRESSES = 10
+
+
+class Profile:
+    """Execution statistics accumulated over one or several computers
+
+    Attributes:
+        instructions -- executed instructions count per opcode and modes
+        addresses -- executed instructions count per address
+        slices -- wall time of each execution slice in seconds
+    """
+
+    def __init__(self):
+        self.instructions: Counter = Counter()
+        self.addresses: Counter = Counter()
+        self.slices: list[float] = []
+
+    def report(self, hot_addresses: int = HOT_ADDRESSES) -> str:
+        """Format statistics as text
+
+        :param hot_addresses: number of most executed addresses listed
+        :return: multi-line report
+        """
+        count = sum(self.instructions.values())
+        elapsed = sum(self.slices)
+        rate = count / elapsed if elapsed else 0
+        lines = [f'{count} instructions in {elapsed:.3f} s '
+                 f'({rate:.0f} instructions/s)']
+        if self.slices:
+            lines.append(
+                f'{len(self.slices)} slices: '
+                f'mean {1e6 * elapsed / len(self.slices):.1f} us, '
+                f'max {1e6 * max(self.slices):.1f} us')
+        lines.append('instructions per opcode and modes:')
+        for (opcode, modes), n in self.instructions.most_common():
+            name = ISA[opcode].name
+            modes = ''.join(str(int(m)) for m in modes)
+            lines.append(f'  {name:<5} {modes:<3} {n:>10} {n / count:7.2%}')
+        lines.append('most executed addresses:')
+        for address, n in self.addresses.most_common(hot_addresses):
+            lines.append(f'  @{address:<6} {n:>10} {n / count:7.2%}')
+        return '\n'.join(lines)
+
+
+class ProfiledComputer(Computer):
+    """Intcode computer recording execution statistics"""
+
+    def __init__(self, program: Iterable[int], inputs: Iterable[int] = (),
+                 profile: Optional[Profile] = None):
+        super().__init__(program=program, inputs=inputs)
+        self.profile = profile if profile is not None else Profile()
+
+    def interpret(self) -> Generator[Optional[int], Optional[int], None]:
+        """Execute the program one instruction at a time
+
+        :return: program execution generator
+        """
+        instructions = self.profile.instructions
+        addresses = self.profile.addresses
+        slices = self.profile.slices
+        inputs = self.inputs
+        start = time.perf_counter()
+        while True:
+            opcode, modes, _ = self.instruction(address=self.pc)
+            if opcode == IN and not inputs:
+                slices.append(time.perf_counter() - start)
+                value = yield None
+                start = time.perf_counter()
+                if value is not None:
+                    inputs.append(value)
+                continue
+            args = ISA[opcode].load_args + ISA[opcode].store_args
+            instructions[opcode, modes[:args]] += 1
+            addresses[self.pc] += 1
+            output = self.step()
+            if opcode == HALT:
+                break
+            if opcode == OUT:
+                slices.append(time.perf_counter() - start)
+                value = yield output
+                start = time.perf_counter()
+                if value is not None:
+                    inputs.append(value)
+        slices.append(time.perf_counter() - start)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Cooperative Intcode scheduler
+
+Many computers are run round-robin within a single thread, each for at most
+a fixed number of jump instructions per time slice, which also bounds the
+number of instructions since straight-line runs are finite. Output values
+are routed along a channel graph into the input queues of other computers.
+A computer starving for inputs is parked until a value is routed to it, so
+that the cost of a pass over the run queue only depends on the runnable
+computers.
+"""
+
+import logging
+from collections import deque
+from typing import Iterable
+
+from common.intcode import PREEMPTED, Computer
+
+log = logging.getLogger(__name__)
+
+SLICE_JUMPS = 250
+
+
+class Scheduler:
+    """Round-robin scheduler over computers linked by channels
+
+    Attributes:
+        budget -- jump instructions executed per time slice
+        computers -- scheduled computers, indexed by machine number
+        routes -- machines receiving the outputs of each machine
+        outputs -- output values per machine
+        ready -- run queue of machine numbers
+        parked -- machines waiting for an input value
+    """
+
+    def __init__(self, budget: int = SLICE_JUMPS):
+        self.budget = budget
+        self.computers: list[Computer] = []
+        self.routes: list[list[int]] = []
+        self.outputs: list[list[int]] = []
+        self.ready: deque[int] = deque()
+        self.parked: set[int] = set()
+
+    def add(self, program: Iterable[int], inputs: Iterable[int] = ()) -> int:
+        """Add a computer to the run queue
+
+        :param program: Intcode program
+        :param inputs: initial input values
+        :return: machine number
+        """
+        machine = len(self.computers)
+        computer = Computer(program=program, inputs=inputs)
+        computer.budget = self.budget
+        self.computers.append(computer)
+        self.routes.append([])
+        self.outputs.append([])
+        self.ready.append(machine)
+        return machine
+
+    def connect(self, source: int, destination: int) -> None:
+        """Route the outputs of a machine to the inputs of another one
+
+        :param source: emitting machine number
+        :param destination: receiving machine number
+        :return: nothing
+        """
+        self.routes[source].append(destination)
+
+    def send(self, machine: int, value: int) -> None:
+        """Queue an input value, waking the machine up if parked
+
+        :param machine: receiving machine number
+        :param value: input value
+        :return: nothing
+        """
+        self.computers[machine].inputs.append(value)
+        if machine in self.parked:
+            self.parked.remove(machine)
+            self.ready.append(machine)
+
+    def run(self) -> list[list[int]]:
+        """Run machines until all of them are halted or parked
+
+        :return: output values per machine
+        """
+        computers = self.computers
+        ready = self.ready
+        slices = 0
+        while ready:
+            machine = ready.popleft()
+            computer = computers[machine]
+            routes = self.routes[machine]
+            outputs = self.outputs[machine]
+            slices += 1
+            for value in computer.execute():
+                if value is PREEMPTED:
+                    ready.append(machine)
+                    break
+                if value is None:
+                    if computer.inputs:
+                        ready.append(machine)
+                    else:
+                        self.parked.add(machine)
+                    break
+                outputs.append(value)
+                for destination in routes:
+                    self.send(machine=destination, value=value)
+        log.debug(f'{slices} slices, {len(self.parked)} machines parked')
+        return self.outputs
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""Advent of Code Programming Puzzles
+
+Intcode execution tracer
+
+The last executed instructions are kept in a fixed-size ring buffer, which is
+printed to the standard error when the program halts or fails on an invalid
+opcode, access mode or address. Tracing is selected by building a `TracedComputer`
+instead of a `Computer`, the interpreter loop of the latter being left
+untouched.
+"""
+
+import logging
+import sys
+from collections import deque
+from typing import Generator, Iterable, NamedTuple, Optional
+
+from common.intcode import (
+    HALT, IN, ISA, OUT, RBS, AddressError, Computer, OpcodeError)
+
+log = logging.getLogger(__name__)
+
+TRACE_DEPTH = 64
+
+
+class TraceEntry(NamedTuple):
+    """Executed instruction record"""
+    pc: int
+    opcode: int
+    operands: tuple[int, ...]
+    result: Optional[int]
+
+
+class TracedComputer(Computer):
+    """Intcode computer recording the last executed instructions
+
+    The result of an instruction is the stored value, the output value, the
+    relative base after a shift or the following address after a jump.
+    """
+
+    def __init__(self, program: Iterable[int], inputs: Iterable[int] = (),
+                 depth: int = TRACE_DEPTH):
+        if depth < 1:
+            raise ValueError(f'Invalid trace depth {depth}')
+        super().__init__(program=program, inputs=inputs)
+        self.trace: deque[TraceEntry] = deque(maxlen=depth)
+
+    def dump(self) -> str:
+        """Format the recorded instructions, oldest first
+
+        :return: multi-line listing
+        """
+        lines = []
+        for pc, opcode, operands, result in self.trace:
+            operands = ', '.join(map(str, operands))
+            lines.append(f'@{pc:<6} {ISA[opcode].name:<5} {operands:<32} '
+                         f'-> {result}')
+        return '\n'.join(lines)
+
+    def interpret(self) -> Generator[Optional[int], Optional[int], None]:
+        """Execute the program one instruction at a time
+
+        :return: program execution generator
+        """
+        trace = self.trace
+        inputs = self.inputs
+        while True:
+            pc = self.pc
+            try:
+                opcode, modes, length = self.instruction(address=pc)
+                if opcode == IN and not inputs:
+                    value = yield None
+                    if value is not None:
+                        inputs.append(value)
+                    continue
+                operands = tuple(self.load(address=pc + 1 + i)
+                                 for i in range(length - 1))
+                store = None
+                if ISA[opcode].store_args:
+                    store = self.operand(mode=modes[length - 2],
+                                         address=pc + length - 1)
+                output = self.step()
+            except (AddressError, OpcodeError, ValueError) as error:
+                print(f'{error} @{pc}, last instructions:\n'
+                      f'{self.dump()}', file=sys.stderr)
+                raise
+            if opcode == HALT:
+                result = None
+            elif store is not None:
+                result = self.load(address=store)
+            elif opcode == OUT:
+                result = output
+            elif opcode == RBS:
+                result = self.rb
+            else:
+                result = self.pc
+            trace.append(TraceEntry(pc=pc, opcode=opcode, operands=operands,
+                                    result=result))
+            if opcode == HALT:
+                break
+            if opcode == OUT:
+                value = yield output
+                if value is not None:
+                    inputs.append(value)
+        print(f'Halted, last instructions:\n{self.dump()}', file=sys.stderr)